@@ -0,0 +1,84 @@
+"""
+Sentinelles - Caches en mémoire du processus
+"""
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class LRUCache:
+    """Cache LRU borné, avec expiration optionnelle des entrées (ttl en secondes)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachedValue:
+    """Valeur calculée à la demande et conservée jusqu'à invalidation ou expiration (ttl en secondes)"""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = None
+        self._valid = False
+        self._generation = 0
+        self._lock = Lock()
+
+    def get(self, compute):
+        with self._lock:
+            if self._valid and (self._expires_at is None or self._expires_at >= time.monotonic()):
+                return self._value
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            # Une invalidation pendant le calcul rend la valeur potentiellement périmée : on ne la garde pas
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl if self.ttl else None
+                self._valid = True
+        return value
+
+    @property
+    def warm(self) -> bool:
+        """Vrai si une valeur valide et non expirée est en cache"""
+        with self._lock:
+            return self._valid and (self._expires_at is None or self._expires_at >= time.monotonic())
+
+    def invalidate(self):
+        with self._lock:
+            self._valid = False
+            self._value = None
+            self._generation += 1
@@ -0,0 +1,99 @@
+"""
+Sentinelles - Coalescence des requêtes identiques (single-flight)
+Les GET identiques reçus pendant qu'un calcul est en cours attendent ce calcul
+au lieu d'ouvrir chacun une connexion et de rejouer les mêmes requêtes SQL
+"""
+
+import asyncio
+import os
+
+from fastapi import Request, Response
+
+from database import run_db, run_in_session
+from metrics import coalesced_requests
+
+# Routes (chemins déclarés) où la coalescence est active ; vide = désactivée partout
+COALESCE_ROUTES = {
+    route.strip() for route in os.getenv(
+        "COALESCE_ROUTES",
+        "/whistleblowers,/whistleblowers/{identifier},/cases,/cases/{identifier},/entities,"
+        "/entities/{identifier},/search,/search/suggest,/batch,/whistleblowers/batch,/cases/batch,/entities/batch"
+    ).split(",") if route.strip()
+}
+
+# En-têtes qui changent la réponse d'une même URL (304 ou 200) : ils font partie de la clé
+KEY_HEADERS = ("if-none-match", "if-modified-since")
+
+
+class SingleFlight:
+    """Calculs en cours par clé : le premier appelant (leader) calcule, les suivants (followers) attendent.
+
+    Le calcul tourne dans sa propre tâche, avec sa propre session (voir coalesce) :
+    l'abandon du leader (client déconnecté) n'annule pas le résultat attendu par les followers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+
+    async def run(self, key, compute):
+        task = self._inflight.get(key)
+        if task is not None:
+            coalesced_requests.inc((self.name, "follower"))
+            return _copy(await asyncio.shield(task))
+
+        coalesced_requests.inc((self.name, "leader"))
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marque l'exception comme lue si plus personne n'attend la tâche
+            task.exception()
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+def _copy(result):
+    """Les réponses sont modifiées à l'envoi (CORS, Server-Timing) : chaque follower reçoit sa copie"""
+    if isinstance(result, Response):
+        return Response(
+            content=result.body, status_code=result.status_code,
+            headers=dict(result.headers), media_type=result.media_type
+        )
+    return result
+
+
+_flights = {}
+
+
+def request_key(request: Request) -> tuple:
+    """Clé normalisée : application, chemin, paramètres triés et en-têtes conditionnels"""
+    return (
+        id(request.app),
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        tuple(request.headers.get(name) for name in KEY_HEADERS),
+    )
+
+
+async def coalesce(request: Request, db, fn):
+    """Exécute fn(session) une seule fois pour toutes les requêtes identiques simultanées.
+
+    Hors coalescence, fn utilise la session `db` de la requête ; le calcul partagé ouvre la sienne,
+    la session du leader étant fermée si sa requête est annulée alors que le calcul continue.
+    """
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path
+    if path not in COALESCE_ROUTES:
+        return await run_db(db, fn)
+
+    flight = _flights.get(path)
+    if flight is None:
+        flight = _flights.setdefault(path, SingleFlight(path))
+    return await flight.run(request_key(request), lambda: run_in_session(request.app.state.database, fn))
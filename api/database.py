@@ -0,0 +1,290 @@
+"""
+Sentinelles - Connexion à la base de données
+Moteur synchrone (psycopg2) et, si db_async est activé, moteur asynchrone (asyncpg).
+Pool configurable et lectures réparties sur des réplicas. Chaque application crée sa
+Database dans son lifespan (app.state.database) ; les scripts utilisent current(), créée
+à la première utilisation. Jamais de moteur à l'import.
+"""
+
+from itertools import count
+from threading import Lock
+import asyncio
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from settings import Settings
+
+# Pilotes asynchrones par backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def engine_options(url: str, settings: Settings, async_mode: bool = False) -> dict:
+    """Options de pool et de connexion ; SQLite garde le pool par défaut de SQLAlchemy"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+    }
+    if settings.statement_timeout_ms:
+        timeout = str(settings.statement_timeout_ms)
+        if async_mode:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+# ==================== RÉPLICAS ====================
+
+class ReplicaRouter:
+    """Répartit les lectures entre réplicas en round-robin, en écartant temporairement ceux en erreur.
+
+    Sans réplica disponible, les lectures retombent sur le primaire.
+    """
+
+    def __init__(self, primary, replicas, cooldown: float = 30):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.cooldown = cooldown
+        self._down_until = {}
+        self._counter = count()
+        self._lock = Lock()
+
+        for replica in self.replicas:
+            event.listen(replica, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(replica)
+        return handle_error
+
+    def mark_down(self, replica):
+        with self._lock:
+            self._down_until[replica] = time.monotonic() + self.cooldown
+
+    def pick(self):
+        if not self.replicas:
+            return self.primary
+        now = time.monotonic()
+        start = next(self._counter)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if self._down_until.get(replica, 0) <= now:
+                return replica
+        return self.primary
+
+
+class RoutingSession(Session):
+    """Session qui lit sur un réplica (choisi à l'ouverture) et écrit sur le primaire"""
+
+    def __init__(self, *args, router: ReplicaRouter = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self._read_bind = router.pick() if router is not None else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.router is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._flushing or (clause is not None and getattr(clause, "is_dml", False)):
+            return self.router.primary
+        return self._read_bind
+
+
+# ==================== MOTEURS ====================
+
+def _pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        status.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                      overflow=pool.overflow())
+    return status
+
+
+class Database:
+    """Moteurs, routeurs de réplicas et fabriques de sessions construits à partir de Settings.
+
+    Le moteur synchrone reste utilisé pour le schéma (create_all, index) et les scripts ;
+    create_engine n'ouvre aucune connexion, warmup() les ouvre à l'avance.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        url = settings.database_url
+        self.engine = create_engine(url, **engine_options(url, settings))
+        self.replica_engines = [create_engine(u, **engine_options(u, settings)) for u in settings.replica_urls]
+        self.router = ReplicaRouter(self.engine, self.replica_engines, settings.replica_cooldown)
+        self.SessionLocal = sessionmaker(
+            class_=RoutingSession, router=self.router, autocommit=False, autoflush=False, bind=self.engine
+        )
+
+        if settings.db_async:
+            self.async_engine = create_async_engine(async_url(url), **engine_options(url, settings, async_mode=True))
+            self.async_replica_engines = [
+                create_async_engine(async_url(u), **engine_options(u, settings, async_mode=True))
+                for u in settings.replica_urls
+            ]
+            self.async_router = ReplicaRouter(
+                self.async_engine.sync_engine, [e.sync_engine for e in self.async_replica_engines],
+                settings.replica_cooldown
+            )
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine, sync_session_class=RoutingSession, router=self.async_router,
+                autoflush=False, expire_on_commit=False
+            )
+        else:
+            self.async_engine = None
+            self.async_replica_engines = []
+            self.async_router = None
+            self.AsyncSessionLocal = None
+
+    def sync_engines(self) -> list:
+        """Tous les moteurs, sous leur forme synchrone (instrumentation, état des pools)"""
+        engines = [self.engine, *self.replica_engines]
+        if self.async_engine is not None:
+            engines += [self.async_engine.sync_engine, *[e.sync_engine for e in self.async_replica_engines]]
+        return engines
+
+    def serving_engines(self) -> list:
+        """Moteurs qui servent les requêtes HTTP"""
+        if self.async_engine is not None:
+            return [self.async_engine, *self.async_replica_engines]
+        return [self.engine, *self.replica_engines]
+
+    async def warmup(self, connections: int):
+        """Ouvre `connections` connexions par moteur de service puis les rend au pool"""
+        if connections <= 0:
+            return
+        for engine in self.serving_engines():
+            if self.async_engine is not None:
+                async def ping(engine=engine):
+                    async with engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+                await asyncio.gather(*[ping() for _ in range(connections)])
+            else:
+                await run_in_threadpool(_warm_sync, engine, connections)
+
+    async def ping(self):
+        """SELECT 1 sur le primaire ; lève l'erreur de connexion le cas échéant"""
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        else:
+            await run_in_threadpool(_ping_sync, self.engine)
+
+    def pool_status(self) -> dict:
+        """État du pool de chaque moteur de service, par URL (sans mot de passe)"""
+        return {
+            engine.url.render_as_string(hide_password=True): _pool_status(getattr(engine, "sync_engine", engine))
+            for engine in self.serving_engines()
+        }
+
+    async def close(self):
+        for engine in [self.async_engine, *self.async_replica_engines]:
+            if engine is not None:
+                await engine.dispose()
+        for engine in [self.engine, *self.replica_engines]:
+            engine.dispose()
+
+
+def _ping_sync(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _warm_sync(engine, connections: int):
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+_current = None
+_lock = Lock()
+
+
+def current() -> Database:
+    """Base des scripts, configurée depuis l'environnement à la première utilisation"""
+    global _current
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = Database(Settings.from_env())
+    return _current
+
+
+# Compatibilité (scripts) : database.engine, database.SessionLocal... désignent current()
+_DATABASE_ATTRIBUTES = {
+    "engine", "replica_engines", "router", "SessionLocal",
+    "async_engine", "async_replica_engines", "async_router", "AsyncSessionLocal",
+}
+
+
+def __getattr__(name):
+    if name in _DATABASE_ATTRIBUTES:
+        return getattr(current(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def get_db(request: Request):
+    """Session de la requête sur la base de l'application : asynchrone (asyncpg) ou synchrone,
+    fermée dans le threadpool"""
+    database = request.app.state.database
+    if database.AsyncSessionLocal is not None:
+        async with database.AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def run_db(db, fn):
+    """Exécute fn(session) : sur le moteur asyncpg via run_sync, sinon dans le threadpool"""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn)
+    return await run_in_threadpool(fn, db)
+
+
+async def run_in_session(database: Database, fn):
+    """Exécute fn(session) dans une session dédiée de `database`, ouverte et fermée par cet appel.
+
+    Pour les calculs partagés entre requêtes (coalesce) : ils ne doivent pas dépendre de la
+    session injectée dans une requête, fermée quand celle-ci se termine ou est annulée.
+    """
+    if database.AsyncSessionLocal is not None:
+        async with database.AsyncSessionLocal() as db:
+            return await db.run_sync(fn)
+    return await run_in_threadpool(_run_in_sync_session, database.SessionLocal, fn)
+
+
+def _run_in_sync_session(session_factory, fn):
+    # Ouverture, calcul et fermeture dans le même thread du threadpool
+    with session_factory() as db:
+        return fn(db)
@@ -0,0 +1,73 @@
+"""
+Sentinelles - Export complet en flux (NDJSON / CSV)
+Lecture par curseur serveur (yield_per) dans une session dédiée, envoi par blocs :
+la mémoire reste constante quelle que soit la taille des tables
+"""
+
+import csv
+import io
+import os
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_rows(session_factory, build_query, to_row):
+    """Parcourt la requête par lots dans une session ouverte et fermée par le flux lui-même"""
+    db = session_factory()
+    try:
+        for obj in build_query(db).yield_per(EXPORT_BATCH_SIZE):
+            yield to_row(obj)
+    finally:
+        db.close()
+
+
+def ndjson_chunks(rows):
+    buffer = bytearray()
+    for row in rows:
+        buffer += orjson.dumps(row)
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _csv_value(value):
+    """Listes à plat : valeurs simples séparées par |, objets encodés en JSON"""
+    if isinstance(value, list):
+        if value and isinstance(value[0], dict):
+            return orjson.dumps(value).decode()
+        return "|".join(str(v) for v in value)
+    return value
+
+
+def csv_chunks(rows, columns: tuple):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row[name]) for name in columns])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def export_response(session_factory, name: str, format: str, build_query, to_row, columns: tuple) -> StreamingResponse:
+    rows = iter_rows(session_factory, build_query, to_row)
+    chunks = csv_chunks(rows, columns) if format == "csv" else ndjson_chunks(rows)
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="sentinelles-{name}.{format}"',
+    })
@@ -0,0 +1,179 @@
+"""
+Sentinelles - Graphe des relations lanceurs d'alerte / affaires / entités
+Liste d'adjacence précalculée en mémoire (whistleblower_cases, case_entities) : voisinage à
+k sauts, plus court chemin entre deux fiches et export complet, sans parcours par l'ORM.
+Rechargé en arrière-plan après une écriture, comme le modèle de lecture (readmodel.ReadModel).
+"""
+
+from collections import deque
+from hashlib import sha1
+from threading import Lock
+import os
+import time
+
+from sqlalchemy import select
+
+from models import Whistleblower, Case, Entity, whistleblower_cases, case_entities
+from serialization import encode
+
+GRAPH_TTL = float(os.getenv("GRAPH_TTL", "300"))
+# Profondeur maximale des voisinages et des chemins demandés à l'API
+GRAPH_MAX_DEPTH = 6
+
+# Tables dont une modification change le graphe
+GRAPH_TABLES = ("whistleblowers", "cases", "entities", "whistleblower_cases", "case_entities")
+
+NODE_TYPES = ("whistleblower", "case", "entity")
+
+
+class Graph:
+    """Graphe non orienté immuable ; les nœuds sont des entiers, identifiés à l'extérieur par "type:id".
+
+    `nodes` : descriptions JSON des nœuds ; `adjacency` : voisins de chaque nœud (tuples d'entiers).
+    """
+
+    def __init__(self, nodes: list, edges: list):
+        self.nodes = tuple(nodes)
+        self.index = {node["id"]: position for position, node in enumerate(self.nodes)}
+        self.by_slug = {(node["type"], node["slug"]): position for position, node in enumerate(self.nodes)}
+
+        neighbours = [[] for _ in self.nodes]
+        self.edge_count = 0
+        for a, b in edges:
+            if a in self.index and b in self.index:
+                neighbours[self.index[a]].append(self.index[b])
+                neighbours[self.index[b]].append(self.index[a])
+                self.edge_count += 1
+        self.adjacency = tuple(tuple(sorted(n)) for n in neighbours)
+        self.loaded_at = time.monotonic()
+        self._export = None
+        self._lock = Lock()
+
+    def summary(self) -> str:
+        return f"{len(self.nodes)} nœuds, {self.edge_count} liens"
+
+    def resolve(self, reference: str):
+        """Position du nœud "type:id" ou "type:slug" ; ValueError si la référence est mal formée"""
+        kind, _, identifier = reference.partition(":")
+        if kind not in NODE_TYPES or not identifier:
+            raise ValueError(reference)
+        if identifier.isdigit():
+            return self.index.get(f"{kind}:{identifier}")
+        return self.by_slug.get((kind, identifier))
+
+    def edges(self, positions) -> list:
+        """Liens entre les nœuds de `positions` (sous-graphe induit), chacun une seule fois"""
+        selected = set(positions)
+        return [
+            [self.nodes[a]["id"], self.nodes[b]["id"]]
+            for a in sorted(selected) for b in self.adjacency[a] if b > a and b in selected
+        ]
+
+    def neighbourhood(self, start: int, depth: int, limit: int) -> dict:
+        """Nœuds à au plus `depth` sauts (parcours en largeur), les plus proches d'abord, au plus `limit`"""
+        distances = {start: 0}
+        queue = deque([start])
+        truncated = False
+        while queue:
+            position = queue.popleft()
+            distance = distances[position]
+            if distance == depth:
+                continue
+            for neighbour in self.adjacency[position]:
+                if neighbour in distances:
+                    continue
+                if len(distances) >= limit:
+                    truncated = True
+                    queue.clear()
+                    break
+                distances[neighbour] = distance + 1
+                queue.append(neighbour)
+
+        return {
+            "center": self.nodes[start],
+            "depth": depth,
+            "nodes": [{**self.nodes[p], "distance": d} for p, d in distances.items()],
+            "edges": self.edges(distances),
+            "truncated": truncated,
+        }
+
+    def shortest_path(self, source: int, target: int, max_depth: int):
+        """Plus court chemin (parcours en largeur depuis les deux extrémités), None au-delà de `max_depth`"""
+        if source == target:
+            return [source]
+        parents = ({source: None}, {target: None})
+        frontiers = ([source], [target])
+        for _ in range(max_depth):
+            # On étend la plus petite des deux frontières
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other = parents[side], parents[1 - side]
+            frontier = []
+            for position in frontiers[side]:
+                for neighbour in self.adjacency[position]:
+                    if neighbour in seen:
+                        continue
+                    seen[neighbour] = position
+                    if neighbour in other:
+                        return self._join(parents, neighbour)
+                    frontier.append(neighbour)
+            if not frontier:
+                return None
+            frontiers = (frontier, frontiers[1]) if side == 0 else (frontiers[0], frontier)
+        return None
+
+    @staticmethod
+    def _join(parents, meeting: int) -> list:
+        path = []
+        position = meeting
+        while position is not None:
+            path.append(position)
+            position = parents[0][position]
+        path.reverse()
+        position = parents[1][meeting]
+        while position is not None:
+            path.append(position)
+            position = parents[1][position]
+        return path
+
+    def export(self):
+        """Corps JSON du graphe complet et son empreinte (ETag), encodés une fois par graphe"""
+        with self._lock:
+            if self._export is None:
+                body = encode({"nodes": self.nodes, "edges": self.edges(range(len(self.nodes)))})
+                self._export = (body, sha1(body).hexdigest()[:20])
+            return self._export
+
+
+def _node(kind: str, id: int, slug: str, name: str) -> dict:
+    return {"id": f"{kind}:{id}", "type": kind, "slug": slug, "name": name}
+
+
+def load_graph(session_factory) -> Graph:
+    """Nœuds publiés (fiches vérifiées, toutes les entités) et tables d'association, en cinq requêtes"""
+    db = session_factory()
+    try:
+        nodes = [
+            _node("whistleblower", *row) for row in db.execute(
+                select(Whistleblower.id, Whistleblower.slug, Whistleblower.name)
+                .where(Whistleblower.is_verified == True).order_by(Whistleblower.id)
+            )
+        ]
+        nodes += [
+            _node("case", *row) for row in db.execute(
+                select(Case.id, Case.slug, Case.name).where(Case.is_verified == True).order_by(Case.id)
+            )
+        ]
+        nodes += [
+            _node("entity", *row) for row in db.execute(select(Entity.id, Entity.slug, Entity.name).order_by(Entity.id))
+        ]
+        edges = [
+            (f"whistleblower:{wb_id}", f"case:{case_id}")
+            for wb_id, case_id in db.execute(select(whistleblower_cases.c.whistleblower_id, whistleblower_cases.c.case_id))
+        ]
+        edges += [
+            (f"case:{case_id}", f"entity:{entity_id}")
+            for case_id, entity_id in db.execute(select(case_entities.c.case_id, case_entities.c.entity_id))
+        ]
+    finally:
+        db.close()
+    return Graph(nodes, edges)
@@ -0,0 +1,296 @@
+"""
+Sentinelles - Import et synchronisation en masse
+
+Charge entités, affaires et lanceurs d'alerte (avec domaines, ressources et liens par slug)
+depuis des fichiers JSON, NDJSON ou CSV, au format de /export. Upserts par lots
+INSERT ... ON CONFLICT (slug) DO UPDATE, une requête par table pour résoudre les slugs :
+relancé sur les mêmes fichiers, l'import ne modifie rien (updated_at et ETag inchangés).
+
+Usage (depuis api/) :
+    python importer.py --entities entities.csv --cases cases.ndjson --whistleblowers whistleblowers.json
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from functools import lru_cache
+import argparse
+import csv
+import json
+import time
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import engine
+from models import (
+    Base, Whistleblower, Case, Entity, Resource, DomainTag, whistleblower_cases, case_entities,
+    ensure_indexes, ensure_domains
+)
+from search import install_search
+from invalidation import install_invalidation
+
+BATCH_SIZE = 5000
+
+# Dialectes qui savent faire un upsert ON CONFLICT
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Colonnes jamais importées : clés techniques et horodatages gérés par la base
+SKIPPED_COLUMNS = {"id", "created_at", "updated_at", "whistleblower_id", "case_id"}
+
+# Champs de liaison (listes de slugs) et collections, tels qu'écrits par /export
+LIST_FIELDS = {"domains", "cases", "whistleblowers", "entities"}
+RESOURCE_COLUMNS = tuple(c.name for c in Resource.__table__.columns if c.name not in SKIPPED_COLUMNS)
+
+
+# ==================== LECTURE ====================
+
+def read_records(path: str) -> list:
+    """Enregistrements d'un fichier .json (liste), .ndjson/.jsonl ou .csv (listes séparées par |)"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [_csv_record(row) for row in csv.DictReader(f)]
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def _csv_record(row: dict) -> dict:
+    record = dict(row)
+    for name in LIST_FIELDS & record.keys():
+        record[name] = [v for v in record[name].split("|") if v] if record[name] else []
+    if "resources" in record:
+        record["resources"] = json.loads(record["resources"]) if record["resources"] else []
+    return record
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "oui")
+
+
+# Conversion des valeurs texte (CSV, dates JSON) selon le type Python de la colonne
+PARSERS = {bool: _parse_bool, int: int, date: date.fromisoformat}
+
+
+def _default(column):
+    default = column.default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+@lru_cache(maxsize=None)
+def importable_columns(table) -> tuple:
+    """(nom, conversion) des colonnes importables, calculés une fois par table"""
+    return tuple(
+        (c.name, PARSERS.get(c.type.python_type)) for c in table.columns if c.name not in SKIPPED_COLUMNS
+    )
+
+
+def table_row(table, record: dict) -> dict:
+    row = {}
+    for name, parse in importable_columns(table):
+        if name in record:
+            value = record[name]
+            if value == "":
+                value = None
+            elif parse is not None and isinstance(value, str):
+                value = parse(value)
+            row[name] = value
+    return row
+
+
+RESOURCE_DEFAULTS = tuple((name, _default(Resource.__table__.c[name])) for name in RESOURCE_COLUMNS)
+
+
+def resource_values(record: dict) -> tuple:
+    """Ressource dans l'ordre de RESOURCE_COLUMNS, valeurs par défaut des colonnes comprises"""
+    row = table_row(Resource.__table__, record)
+    return tuple(row.get(name, default) for name, default in RESOURCE_DEFAULTS)
+
+
+# ==================== ÉCRITURE ====================
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def upsert(conn, table, rows: list) -> set:
+    """INSERT ... ON CONFLICT (slug) DO UPDATE, seulement si une colonne a réellement changé ;
+    renvoie les ids des lignes insérées ou modifiées"""
+    if not rows:
+        return set()
+    rows = list({row["slug"]: row for row in rows}.values())
+    columns = sorted({name for row in rows for name in row} - {"slug"})
+    defaults = {name: _default(table.c[name]) for name in columns}
+    rows = [{"slug": row["slug"], **{name: row.get(name, defaults[name]) for name in columns}} for row in rows]
+
+    stmt = UPSERT_INSERTS[conn.dialect.name](table)
+    if columns:
+        values = {name: stmt.excluded[name] for name in columns}
+        if "updated_at" in table.c:
+            values["updated_at"] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.slug], set_=values,
+            where=or_(*[table.c[name].is_distinct_from(stmt.excluded[name]) for name in columns])
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.slug])
+    changed = set()
+    for batch in _batches(rows):
+        changed.update(conn.execute(stmt.returning(table.c.id), batch).scalars())
+    return changed
+
+
+# Fiches dont la page détaillée reprend des colonnes d'une fiche liée (models.LINKED_FIELDS) ; toute
+# ligne modifiée par l'upsert les fait avancer, même pour une colonne non affichée (approximation sûre).
+# Type modifié -> (table d'association, clé du type modifié, clé de la fiche à faire avancer)
+LINKED_PAGES = {
+    "whistleblowers": (whistleblower_cases, "whistleblower_id", "case_id"),
+    "cases": (whistleblower_cases, "case_id", "whistleblower_id"),
+    "entities": (case_entities, "entity_id", "case_id"),
+}
+
+
+def linked_pages(conn, kind: str, ids: set) -> set:
+    """(clé, id) des fiches liées aux fiches `ids` de type `kind`, dont la page les affiche"""
+    table, key, other = LINKED_PAGES[kind]
+    linked = set()
+    for batch in _batches(sorted(ids)):
+        linked.update((other, i) for i in conn.execute(select(table.c[other]).where(table.c[key].in_(batch))).scalars())
+    return linked
+
+
+def slug_ids(conn, table) -> dict:
+    return dict(conn.execute(select(table.c.slug, table.c.id)).all())
+
+
+def sync_children(conn, table, owner: str, wanted: dict, columns: tuple) -> set:
+    """Remplace les lignes enfants (tags, ressources) des propriétaires dont le contenu a changé"""
+    existing = defaultdict(list)
+    query = select(table.c[owner], *[table.c[name] for name in columns]).where(
+        table.c[owner].isnot(None)
+    ).order_by(table.c.id)
+    for row in conn.execute(query):
+        existing[row[0]].append(tuple(row[1:]))
+
+    changed = [owner_id for owner_id, rows in wanted.items() if existing.get(owner_id, []) != rows]
+    for batch in _batches(changed):
+        conn.execute(delete(table).where(table.c[owner].in_(batch)))
+    rows = [{owner: owner_id, **dict(zip(columns, values))} for owner_id in changed for values in wanted[owner_id]]
+    for batch in _batches(rows):
+        conn.execute(insert(table), batch)
+    return set(changed)
+
+
+def sync_links(conn, table, owner: str, other: str, wanted: dict) -> set:
+    """Remplace les liens d'association des propriétaires concernés ; renvoie les deux extrémités modifiées"""
+    existing = defaultdict(set)
+    for owner_id, other_id in conn.execute(select(table.c[owner], table.c[other])):
+        existing[owner_id].add(other_id)
+
+    touched = set()
+    changed = []
+    for owner_id, others in wanted.items():
+        diff = existing.get(owner_id, set()) ^ others
+        if diff:
+            changed.append(owner_id)
+            touched |= {(owner, owner_id)} | {(other, other_id) for other_id in diff}
+    for batch in _batches(changed):
+        conn.execute(delete(table).where(table.c[owner].in_(batch)))
+    rows = [{owner: owner_id, other: other_id} for owner_id in changed for other_id in wanted[owner_id]]
+    for batch in _batches(rows):
+        conn.execute(insert(table), batch)
+    return touched
+
+
+def touch(conn, table, ids):
+    """Fait avancer updated_at (et donc les ETag) des fiches dont les tags, ressources ou liens ont changé"""
+    for batch in _batches(sorted(ids)):
+        conn.execute(update(table).where(table.c.id.in_(batch)).values(updated_at=datetime.utcnow()))
+
+
+# ==================== IMPORT ====================
+
+def import_records(entities=(), cases=(), whistleblowers=(), bind=engine) -> dict:
+    """Importe les enregistrements dans une seule transaction ; renvoie le nombre de lignes par étape"""
+    tables = {"entities": Entity.__table__, "cases": Case.__table__, "whistleblowers": Whistleblower.__table__}
+    records = {"entities": list(entities), "cases": list(cases), "whistleblowers": list(whistleblowers)}
+    for kind, items in records.items():
+        missing = [i for i, record in enumerate(items) if not record.get("slug")]
+        if missing:
+            raise ValueError(f"{kind} : slug manquant pour les enregistrements {missing[:10]}")
+
+    counts = {}
+    unknown = set()
+    with bind.begin() as conn:
+        touched = set()
+        for kind, table in tables.items():
+            counts[kind] = len({record["slug"] for record in records[kind]})
+            touched |= linked_pages(conn, kind, upsert(conn, table, [table_row(table, record) for record in records[kind]]))
+        ids = {kind: slug_ids(conn, table) for kind, table in tables.items()}
+
+        def resolve(kind: str, slugs) -> set:
+            unknown.update(f"{kind}/{slug}" for slug in slugs if slug not in ids[kind])
+            return {ids[kind][slug] for slug in slugs if slug in ids[kind]}
+
+        for kind, owner in (("cases", "case_id"), ("whistleblowers", "whistleblower_id")):
+            table = tables[kind]
+            tags = {ids[kind][r["slug"]]: [(d,) for d in r["domains"]] for r in records[kind] if "domains" in r}
+            resources = {
+                ids[kind][r["slug"]]: [resource_values(res) for res in r["resources"]]
+                for r in records[kind] if "resources" in r
+            }
+            changed = sync_children(conn, DomainTag.__table__, owner, tags, ("domain",))
+            changed |= sync_children(conn, Resource.__table__, owner, resources, RESOURCE_COLUMNS)
+            touched |= {(owner, owner_id) for owner_id in changed}
+            counts[f"{kind}.domains"] = sum(len(v) for v in tags.values())
+            counts[f"{kind}.resources"] = sum(len(v) for v in resources.values())
+
+        for kind, field, table, owner, other, other_kind in (
+            ("whistleblowers", "cases", whistleblower_cases, "whistleblower_id", "case_id", "cases"),
+            ("cases", "whistleblowers", whistleblower_cases, "case_id", "whistleblower_id", "whistleblowers"),
+            ("cases", "entities", case_entities, "case_id", "entity_id", "entities"),
+            ("entities", "cases", case_entities, "entity_id", "case_id", "cases"),
+        ):
+            links = {ids[kind][r["slug"]]: resolve(other_kind, r[field]) for r in records[kind] if field in r}
+            touched |= sync_links(conn, table, owner, other, links)
+            counts[f"{kind}.{field}"] = sum(len(v) for v in links.values())
+
+        touch(conn, Whistleblower.__table__, {i for column, i in touched if column == "whistleblower_id"})
+        touch(conn, Case.__table__, {i for column, i in touched if column == "case_id"})
+
+    if unknown:
+        print(f"⚠️  {len(unknown)} slugs référencés introuvables, liens ignorés : {', '.join(sorted(unknown)[:10])}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", help="Fichier d'entités (.json, .ndjson ou .csv)")
+    parser.add_argument("--cases", help="Fichier d'affaires")
+    parser.add_argument("--whistleblowers", help="Fichier de lanceurs d'alerte")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    ensure_domains(engine)
+    install_search(engine)
+    install_invalidation(engine)
+
+    started = time.perf_counter()
+    counts = import_records(
+        entities=read_records(args.entities) if args.entities else (),
+        cases=read_records(args.cases) if args.cases else (),
+        whistleblowers=read_records(args.whistleblowers) if args.whistleblowers else (),
+    )
+    for name, n in counts.items():
+        print(f"   - {name}: {n}")
+    print(f"✅ Import terminé en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Sentinelles - Invalidation des caches entre workers (PostgreSQL LISTEN/NOTIFY)
+Des triggers publient la table et l'id de chaque ligne modifiée du catalogue, quelle que
+soit l'origine de l'écriture (ORM, import en masse, psql) ; chaque worker écoute le canal
+sur le primaire et transmet les changements aux callbacks de on_catalog_change.
+"""
+
+from threading import Thread
+import json
+import logging
+import os
+import select
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from models import CATALOG_TABLES, CatalogChange, create_if_missing, emit_change, lock_ddl
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+INVALIDATION_BUS = _env_bool("INVALIDATION_BUS", "true")
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "sentinelles_catalog")
+# Délai (s) avant reconnexion de l'écouteur après une perte de connexion
+INVALIDATION_RECONNECT_DELAY = 5
+# Au-delà de ce nombre de lignes reçues d'un coup (import en masse), tout est invalidé en une fois
+INVALIDATION_BATCH_LIMIT = 1000
+
+logger = logging.getLogger("sentinelles.invalidation")
+
+# Charge utile : {"table": ..., "id": ...} ; les tables d'association n'ont pas d'id
+NOTIFY_FUNCTION = """
+CREATE FUNCTION sentinelles_notify_change() RETURNS trigger AS $function$
+DECLARE
+    changed jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := to_jsonb(OLD);
+    ELSE
+        changed := to_jsonb(NEW);
+    END IF;
+    PERFORM pg_notify(TG_ARGV[0], jsonb_strip_nulls(
+        jsonb_build_object('table', TG_TABLE_NAME, 'id', changed->'id')
+    )::text);
+    RETURN NULL;
+END
+$function$ LANGUAGE plpgsql
+"""
+
+
+def install_invalidation(engine):
+    """Crée la fonction et les triggers de notification s'ils manquent (PostgreSQL uniquement).
+
+    Les triggers existants sont conservés tels quels : changer INVALIDATION_CHANNEL ou la
+    fonction demande de les supprimer (DROP) avant le redémarrage.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        lock_ddl(conn)
+        create_if_missing(conn, "SELECT 1 FROM pg_proc WHERE proname = 'sentinelles_notify_change'", NOTIFY_FUNCTION)
+        for table in CATALOG_TABLES:
+            create_if_missing(
+                conn,
+                f"SELECT 1 FROM pg_trigger WHERE tgrelid = '{table}'::regclass AND tgname = '{table}_notify_change'",
+                f"CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION sentinelles_notify_change('{INVALIDATION_CHANNEL}')"
+            )
+
+
+def parse_notification(payload: str) -> CatalogChange:
+    data = json.loads(payload)
+    return CatalogChange(data["table"], data.get("id"))
+
+
+def dispatch(changes: list):
+    """Transmet les changements reçus, sans doublons ; un lot trop gros devient une invalidation totale"""
+    changes = list(dict.fromkeys(changes))
+    if len(changes) > INVALIDATION_BATCH_LIMIT:
+        changes = [CatalogChange(None)]
+    for change in changes:
+        emit_change(change)
+
+
+class InvalidationListener:
+    """Écoute le canal dans un thread dédié, sur une connexion hors pool.
+
+    Après une reconnexion, des notifications ont pu être perdues : tout est invalidé.
+    """
+
+    def __init__(self, url, channel: str = INVALIDATION_CHANNEL):
+        self.engine = create_engine(url, poolclass=NullPool)
+        self.channel = channel
+        self._stopping = False
+        self._connections = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Écoute des invalidations interrompue, reconnexion dans %s s",
+                                 INVALIDATION_RECONNECT_DELAY)
+                time.sleep(INVALIDATION_RECONNECT_DELAY)
+
+    def _listen(self):
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f'LISTEN "{self.channel}"'))
+            dbapi_connection = conn.connection.dbapi_connection
+            self._connections += 1
+            if self._connections > 1:
+                dispatch([CatalogChange(None)])
+
+            while not self._stopping:
+                if select.select([dbapi_connection], [], [], 5.0) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                changes = []
+                while dbapi_connection.notifies:
+                    changes.append(parse_notification(dbapi_connection.notifies.pop(0).payload))
+                dispatch(changes)
+
+
+def start_listener(engine):
+    """Démarre l'écoute sur le primaire (les réplicas ne relaient pas NOTIFY) ; None hors PostgreSQL"""
+    if not INVALIDATION_BUS or engine.dialect.name != "postgresql":
+        return None
+    listener = InvalidationListener(engine.url)
+    listener.start()
+    return listener
@@ -0,0 +1,239 @@
+"""
+Sentinelles - Instrumentation des requêtes
+Nombre de requêtes SQL, temps base / handler / sérialisation par appel,
+en-têtes Server-Timing, histogrammes et compteurs Prometheus par route et journal des requêtes lentes
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+import inspect
+import logging
+import os
+import time
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+logger = logging.getLogger("sentinelles.sql")
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "db_time", "handler_time", "route_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.handler_time = 0.0
+        self.route_time = 0.0
+
+    @property
+    def serialization_time(self) -> float:
+        """Temps passé dans la route hors handler : validation et encodage de la réponse"""
+        return max(self.route_time - self.handler_time, 0.0)
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+def current_metrics():
+    return _current.get()
+
+
+# ==================== SQL ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_time += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Requête lente (%.1f ms) : %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def instrument_engine(engine):
+    """Branche le comptage et le chronométrage des requêtes sur un moteur (synchrone)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ==================== HISTOGRAMMES ====================
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus, étiqueté par (route, méthode)"""
+
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for (route, method), (counts, total, count) in sorted(self._series.items()):
+                labels = f'route="{route}",method="{method}"'
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{labels}}} {total}")
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Compteur cumulatif au format Prometheus, étiqueté par les noms de `label_names`"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, labels: tuple, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, labels: tuple) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                rendered = ",".join(f'{name}="{v}"' for name, v in zip(self.label_names, labels))
+                lines.append(f"{self.name}{{{rendered}}} {value}")
+        return lines
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+request_duration = Histogram(
+    "sentinelles_request_duration_seconds", "Durée totale des requêtes HTTP", LATENCY_BUCKETS)
+request_db_duration = Histogram(
+    "sentinelles_request_db_seconds", "Temps passé en base par requête HTTP", LATENCY_BUCKETS)
+request_serialization_duration = Histogram(
+    "sentinelles_request_serialization_seconds", "Temps de validation et d'encodage des réponses", LATENCY_BUCKETS)
+request_queries = Histogram(
+    "sentinelles_request_queries", "Nombre de requêtes SQL par requête HTTP", (0, 1, 2, 3, 5, 10, 20, 50, 100))
+
+HISTOGRAMS = [request_duration, request_db_duration, request_serialization_duration, request_queries]
+
+# Requêtes servies par coalescence : leader (calcul effectif) ou follower (résultat partagé)
+coalesced_requests = Counter(
+    "sentinelles_coalesced_requests_total", "Requêtes GET identiques traitées par coalescence", ("route", "role"))
+
+COUNTERS = [coalesced_requests]
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in HISTOGRAMS + COUNTERS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==================== ROUTES ET MIDDLEWARE ====================
+
+def _timed_endpoint(endpoint):
+    # Déjà chronométré : include_router recrée les routes d'un APIRouter avec leur endpoint enveloppé
+    if getattr(endpoint, "_timed", False):
+        return endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                metrics = _current.get()
+                if metrics is not None:
+                    metrics.handler_time += time.perf_counter() - started
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                metrics = _current.get()
+                if metrics is not None:
+                    metrics.handler_time += time.perf_counter() - started
+    wrapper._timed = True
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """Route FastAPI qui chronomètre séparément le handler et la sérialisation de la réponse"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request: Request):
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                metrics = _current.get()
+                if metrics is not None:
+                    metrics.route_time += time.perf_counter() - started
+
+        return instrumented_handler
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+async def metrics_middleware(request: Request, call_next):
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+    total = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    labels = (route.path if route is not None else "unmatched", request.method)
+    request_duration.observe(labels, total)
+    request_db_duration.observe(labels, metrics.db_time)
+    request_serialization_duration.observe(labels, metrics.serialization_time)
+    request_queries.observe(labels, metrics.queries)
+
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={_ms(metrics.db_time)};desc="{metrics.queries} queries"',
+        f"handler;dur={_ms(metrics.handler_time)}",
+        f"serialize;dur={_ms(metrics.serialization_time)}",
+        f"total;dur={_ms(total)}",
+    ])
+    return response
@@ -3,14 +3,23 @@ Sentinelles - Modèles de données
 Lanceurs d'alerte & Affaires majeures
 """
 
-from sqlalchemy import Column, Integer, String, Text, Date, Boolean, ForeignKey, Table, DateTime
+from sqlalchemy import (
+    Column, Integer, String, Text, Date, Boolean, ForeignKey, Table, DateTime, Index, JSON,
+    event, func, false, literal_column, select, inspect, text
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session, query_expression, attributes, object_session
 from datetime import datetime
+from typing import NamedTuple, Optional
 import enum
 
 Base = declarative_base()
 
+# Liste de domaines : tableau PostgreSQL (indexé en GIN, opérateurs && et @>), JSON sous SQLite
+DomainList = ARRAY(String(50)).with_variant(JSON(), "sqlite")
+
 
 # ==================== ENUMS ====================
 
@@ -84,14 +93,16 @@ whistleblower_cases = Table(
     'whistleblower_cases',
     Base.metadata,
     Column('whistleblower_id', Integer, ForeignKey('whistleblowers.id'), primary_key=True),
-    Column('case_id', Integer, ForeignKey('cases.id'), primary_key=True)
+    Column('case_id', Integer, ForeignKey('cases.id'), primary_key=True),
+    Index('ix_whistleblower_cases_case_id', 'case_id')
 )
 
 case_entities = Table(
     'case_entities',
     Base.metadata,
     Column('case_id', Integer, ForeignKey('cases.id'), primary_key=True),
-    Column('entity_id', Integer, ForeignKey('entities.id'), primary_key=True)
+    Column('entity_id', Integer, ForeignKey('entities.id'), primary_key=True),
+    Index('ix_case_entities_entity_id', 'entity_id')
 )
 
 
@@ -114,6 +125,7 @@ class Whistleblower(Base):
     revelation_year = Column(Integer, nullable=True)
     
     summary = Column(Text, nullable=False)
+    summary_excerpt = query_expression()  # extrait calculé en SQL pour les listes
     context = Column(Text, nullable=True)
     stakes = Column(Text, nullable=True)
     impact = Column(Text, nullable=True)
@@ -132,11 +144,13 @@ class Whistleblower(Base):
     is_verified = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Copie dénormalisée des DomainTag (dans leur ordre), tenue à jour avant chaque flush
+    domains = Column(DomainList, default=list)
     
     resources = relationship("Resource", back_populates="whistleblower", cascade="all, delete-orphan",
-                            foreign_keys="Resource.whistleblower_id")
+                            foreign_keys="Resource.whistleblower_id", order_by="Resource.id")
     domain_tags = relationship("DomainTag", back_populates="whistleblower", cascade="all, delete-orphan",
-                              foreign_keys="DomainTag.whistleblower_id")
+                              foreign_keys="DomainTag.whistleblower_id", order_by="DomainTag.id")
     cases = relationship("Case", secondary=whistleblower_cases, back_populates="whistleblowers")
 
 
@@ -159,6 +173,7 @@ class Case(Base):
     period_end = Column(Integer, nullable=True)
     
     summary = Column(Text, nullable=False)
+    summary_excerpt = query_expression()  # extrait calculé en SQL pour les listes
     context = Column(Text, nullable=True)
     revelations = Column(Text, nullable=True)
     
@@ -181,13 +196,41 @@ class Case(Base):
     is_verified = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Copie dénormalisée des DomainTag (dans leur ordre), tenue à jour avant chaque flush
+    domains = Column(DomainList, default=list)
     
     whistleblowers = relationship("Whistleblower", secondary=whistleblower_cases, back_populates="cases")
     entities = relationship("Entity", secondary=case_entities, back_populates="cases")
     resources = relationship("Resource", back_populates="case", cascade="all, delete-orphan",
-                            foreign_keys="Resource.case_id")
+                            foreign_keys="Resource.case_id", order_by="Resource.id")
     domain_tags = relationship("DomainTag", back_populates="case", cascade="all, delete-orphan",
-                              foreign_keys="DomainTag.case_id")
+                              foreign_keys="DomainTag.case_id", order_by="DomainTag.id")
+
+
+def listing_order(model):
+    """Expressions de tri des listes (featured, année, id), couvertes par l'index ix_<table>_listing"""
+    return (
+        func.coalesce(model.is_featured, false()),
+        func.coalesce(model.revelation_year, literal_column("0")),
+        model.id,
+    )
+
+
+for _model in (Whistleblower, Case):
+    Index(f"ix_{_model.__tablename__}_listing", *listing_order(_model))
+
+
+def domains_filter(model, bind, domains: list, match_all: bool = False):
+    """Fiches portant un (any) ou tous (all) les domaines demandés.
+
+    PostgreSQL : opérateurs && / @> sur le tableau, servis par l'index GIN ix_<table>_domains.
+    SQLite : même sémantique via json_each, sans index.
+    """
+    if bind.dialect.name == "postgresql":
+        return model.domains.contains(domains) if match_all else model.domains.overlap(domains)
+    each = func.json_each(model.domains).table_valued("value")
+    matches = select(func.count(func.distinct(each.c.value))).where(each.c.value.in_(domains)).scalar_subquery()
+    return matches >= len(set(domains)) if match_all else matches > 0
 
 
 class Entity(Base):
@@ -212,8 +255,8 @@ class Resource(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     
-    whistleblower_id = Column(Integer, ForeignKey('whistleblowers.id'), nullable=True)
-    case_id = Column(Integer, ForeignKey('cases.id'), nullable=True)
+    whistleblower_id = Column(Integer, ForeignKey('whistleblowers.id'), nullable=True, index=True)
+    case_id = Column(Integer, ForeignKey('cases.id'), nullable=True, index=True)
     
     resource_type = Column(String(50), nullable=False)
     title = Column(String(300), nullable=False)
@@ -236,8 +279,8 @@ class DomainTag(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     
-    whistleblower_id = Column(Integer, ForeignKey('whistleblowers.id'), nullable=True)
-    case_id = Column(Integer, ForeignKey('cases.id'), nullable=True)
+    whistleblower_id = Column(Integer, ForeignKey('whistleblowers.id'), nullable=True, index=True)
+    case_id = Column(Integer, ForeignKey('cases.id'), nullable=True, index=True)
     
     domain = Column(String(50), nullable=False)
     
@@ -259,3 +302,316 @@ class Timeline(Base):
     source_url = Column(String(500), nullable=True)
     
     case = relationship("Case")
+
+
+def ensure_indexes(engine):
+    """Crée les index manquants sur des tables déjà existantes (create_all ne le fait pas)"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Verrou consultatif pris par les créations de fonctions et triggers PostgreSQL au démarrage
+DDL_LOCK_KEY = 7_315_001
+
+
+def lock_ddl(conn):
+    """Sérialise les workers démarrés ensemble jusqu'à la fin de la transaction (PostgreSQL)"""
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": DDL_LOCK_KEY})
+
+
+def create_if_missing(conn, exists: str, ddl: str):
+    """Exécute `ddl` si la requête `exists` ne renvoie aucune ligne, dans un bloc DO (PostgreSQL).
+
+    Objet déjà présent : aucun verrou sur les tables, un redémarrage ne bloque pas le trafic.
+    """
+    conn.execute(text(f"DO $ddl$ BEGIN IF NOT EXISTS ({exists}) THEN {ddl}; END IF; END $ddl$"))
+
+
+# Remplissage initial de la colonne domains à partir des DomainTag existants
+DOMAINS_BACKFILL = {
+    "postgresql": """
+        UPDATE {table} p SET domains = coalesce(
+            (SELECT array_agg(t.domain ORDER BY t.id) FROM domain_tags t WHERE t.{owner} = p.id), '{{}}'
+        ) WHERE domains IS NULL
+    """,
+    "sqlite": """
+        UPDATE {table} SET domains = (
+            SELECT json_group_array(domain) FROM (
+                SELECT t.domain FROM domain_tags t WHERE t.{owner} = {table}.id ORDER BY t.id
+            )
+        ) WHERE domains IS NULL
+    """,
+}
+
+
+# Recalcul de domains pour les fiches dont des DomainTag ont été ajoutés, modifiés, déplacés ou supprimés
+# hors ORM (psql, scripts SQL). Triggers par instruction : une seule passe pour un import en masse.
+# Sans changement effectif (écriture faite par l'ORM, déjà recopiée), la fiche n'est pas réécrite.
+DOMAINS_SYNC_FUNCTION = """
+CREATE FUNCTION sentinelles_sync_domains() RETURNS trigger AS $function$
+DECLARE
+    whistleblower_ids integer[];
+    case_ids integer[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT whistleblower_id), array_agg(DISTINCT case_id)
+        INTO whistleblower_ids, case_ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT whistleblower_id), array_agg(DISTINCT case_id)
+        INTO whistleblower_ids, case_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT whistleblower_id), array_agg(DISTINCT case_id)
+        INTO whistleblower_ids, case_ids
+        FROM (SELECT whistleblower_id, case_id FROM old_rows UNION ALL SELECT whistleblower_id, case_id FROM new_rows) r;
+    END IF;
+    UPDATE whistleblowers p SET domains = d.domains, updated_at = timezone('utc', clock_timestamp())
+    FROM (
+        SELECT o.id, coalesce(
+            (SELECT array_agg(t.domain ORDER BY t.id) FROM domain_tags t WHERE t.whistleblower_id = o.id), '{}'
+        ) AS domains
+        FROM unnest(whistleblower_ids) AS o(id)
+    ) d
+    WHERE p.id = d.id AND p.domains IS DISTINCT FROM d.domains;
+    UPDATE cases p SET domains = d.domains, updated_at = timezone('utc', clock_timestamp())
+    FROM (
+        SELECT o.id, coalesce(
+            (SELECT array_agg(t.domain ORDER BY t.id) FROM domain_tags t WHERE t.case_id = o.id), '{}'
+        ) AS domains
+        FROM unnest(case_ids) AS o(id)
+    ) d
+    WHERE p.id = d.id AND p.domains IS DISTINCT FROM d.domains;
+    RETURN NULL;
+END
+$function$ LANGUAGE plpgsql
+"""
+
+DOMAINS_SYNC_TRIGGERS = {
+    "insert": "REFERENCING NEW TABLE AS new_rows",
+    "update": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "delete": "REFERENCING OLD TABLE AS old_rows",
+}
+
+
+# Recalcul complet, fait une fois à la création des triggers : rattrape les écritures SQL antérieures
+DOMAINS_RESYNC = """
+    UPDATE {table} p SET domains = d.domains, updated_at = timezone('utc', clock_timestamp())
+    FROM (
+        SELECT q.id, coalesce(
+            (SELECT array_agg(t.domain ORDER BY t.id) FROM domain_tags t WHERE t.{owner} = q.id), '{{}}'
+        ) AS domains
+        FROM {table} q
+    ) d
+    WHERE p.id = d.id AND p.domains IS DISTINCT FROM d.domains
+"""
+
+
+def install_domains_sync(conn):
+    """Fonction et triggers PostgreSQL gardant domains égal aux DomainTag, créés seulement s'ils manquent"""
+    lock_ddl(conn)
+    resync = "; ".join(
+        DOMAINS_RESYNC.format(table=table, owner=owner)
+        for table, owner in (("whistleblowers", "whistleblower_id"), ("cases", "case_id"))
+    )
+    create_if_missing(conn, "SELECT 1 FROM pg_proc WHERE proname = 'sentinelles_sync_domains'", DOMAINS_SYNC_FUNCTION)
+    for event_name, referencing in DOMAINS_SYNC_TRIGGERS.items():
+        name = f"domain_tags_sync_domains_{event_name}"
+        ddl = (
+            f"CREATE TRIGGER {name} AFTER {event_name.upper()} ON domain_tags {referencing} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION sentinelles_sync_domains()"
+        )
+        if event_name == "insert":
+            ddl = f"{ddl}; {resync}"
+        create_if_missing(
+            conn, f"SELECT 1 FROM pg_trigger WHERE tgrelid = 'domain_tags'::regclass AND tgname = '{name}'", ddl,
+        )
+
+
+def ensure_domains(engine):
+    """Ajoute et remplit la colonne domains sur une base existante ; index GIN et triggers de
+    synchronisation sous PostgreSQL.
+
+    Sans PostgreSQL (SQLite), rien ne recopie les tags écrits hors ORM : domain_tags ne doit être
+    modifiée que par l'ORM (voir _touch_updated_at) ou par importer.py, jamais en SQL direct.
+    """
+    with engine.begin() as conn:
+        for model, owner in ((Whistleblower, "whistleblower_id"), (Case, "case_id")):
+            table = model.__tablename__
+            if "domains" not in {c["name"] for c in inspect(conn).get_columns(table)}:
+                column_type = model.__table__.c.domains.type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN domains {column_type}"))
+            conn.execute(text(DOMAINS_BACKFILL[conn.dialect.name].format(table=table, owner=owner)))
+            if conn.dialect.name == "postgresql":
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_domains ON {table} USING gin (domains)"))
+        if conn.dialect.name == "postgresql":
+            install_domains_sync(conn)
+
+
+# ==================== ÉVÉNEMENTS ====================
+
+class CatalogChange(NamedTuple):
+    """Ligne modifiée du catalogue (table, id) ; table None : tout est à recharger"""
+    table: Optional[str]
+    id: Optional[int] = None
+
+    def affects(self, *tables) -> bool:
+        return self.table is None or self.table in tables
+
+
+# Tables dont les modifications sont signalées (voir aussi invalidation.py)
+CATALOG_TABLES = (
+    "whistleblowers", "cases", "entities", "resources", "domain_tags", "whistleblower_cases", "case_entities",
+)
+
+_change_listeners = []
+
+
+def on_catalog_change(callback):
+    """Enregistre un callback appelé avec un CatalogChange à chaque insertion, mise à jour ou suppression,
+    une fois la transaction validée"""
+    _change_listeners.append(callback)
+    return callback
+
+
+def remove_catalog_listener(callback):
+    """Retire un callback de on_catalog_change (arrêt d'une application) ; sans effet s'il est absent"""
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+
+def emit_change(change: CatalogChange):
+    # Copie : un callback peut être retiré pendant la diffusion (arrêt d'une application)
+    for callback in tuple(_change_listeners):
+        callback(change)
+
+
+# Clé de Session.info : changements du flush en attente du commit
+PENDING_CHANGES = "sentinelles_pending_changes"
+
+
+def _collect_change(mapper, connection, target):
+    # Diffusé au commit : avant, une requête concurrente remettrait en cache l'état non validé
+    session = object_session(target)
+    session.info.setdefault(PENDING_CHANGES, []).append(CatalogChange(mapper.local_table.name, target.id))
+
+
+for _model in (Whistleblower, Case, Entity, Resource, DomainTag):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _collect_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _emit_pending_changes(session):
+    for change in dict.fromkeys(session.info.pop(PENDING_CHANGES, ())):
+        emit_change(change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
+
+
+def _history(obj, key):
+    return attributes.get_history(obj, key, passive=attributes.PASSIVE_NO_INITIALIZE)
+
+
+OWNER_KEYS = ((Whistleblower, "whistleblower", "whistleblower_id"), (Case, "case", "case_id"))
+
+
+def _owners(session, obj) -> list:
+    """Fiches (lanceur d'alerte, affaire) auxquelles une ressource ou un tag est rattaché.
+
+    La relation ou la clé étrangère modifiée en dernier l'emporte : avant le flush, l'autre
+    côté n'est pas encore synchronisé.
+    """
+    owners = []
+    for model, relation, key in OWNER_KEYS:
+        if _history(obj, relation).has_changes():
+            owner = getattr(obj, relation)
+        elif _history(obj, key).has_changes():
+            owner = session.get(model, getattr(obj, key)) if getattr(obj, key) is not None else None
+        else:
+            owner = getattr(obj, relation)
+            if owner is None and getattr(obj, key) is not None:
+                owner = session.get(model, getattr(obj, key))
+        if owner is not None and owner not in session.deleted:
+            owners.append(owner)
+    return owners
+
+
+def _previous_owners(session, obj) -> list:
+    """Fiches dont une ressource ou un tag vient d'être détaché (relation ou clé étrangère changée)"""
+    owners = []
+    for model, relation, key in OWNER_KEYS:
+        relation_history = _history(obj, relation)
+        owners += relation_history.deleted
+        # Relation changée sans que l'ancienne valeur soit chargée : la clé étrangère la désigne encore
+        if relation_history.has_changes() and not _history(obj, key).has_changes() and getattr(obj, key) is not None:
+            owners.append(session.get(model, getattr(obj, key)))
+        owners += [session.get(model, id) for id in _history(obj, key).deleted if id is not None]
+    return [owner for owner in owners if owner is not None and owner not in session.deleted]
+
+
+# Colonnes d'une fiche reprises sur la page détaillée des fiches liées (voir main.py, *_detail)
+LINKED_FIELDS = {
+    Whistleblower: ("slug", "name", "photo_url", "status"),
+    Case: ("slug", "name", "revelation_year"),
+    Entity: ("slug", "name", "entity_type", "country", "logo_url"),
+}
+
+# Relation vers les fiches dont la page détaillée reprend la fiche (les entités n'ont pas d'ETag)
+LINKED_PAGES = {Whistleblower: "cases", Case: "whistleblowers", Entity: "cases"}
+
+
+def _linked_pages(session, obj) -> list:
+    """Fiches liées dont la page détaillée change avec `obj` : liens ajoutés ou retirés,
+    champs affichés modifiés, fiche supprimée"""
+    relation = LINKED_PAGES[type(obj)]
+    history = _history(obj, relation)
+    linked = list(history.added) + list(history.deleted)
+    if obj in session.deleted or (
+        obj in session.dirty and any(_history(obj, name).has_changes() for name in LINKED_FIELDS[type(obj)])
+    ):
+        linked += getattr(obj, relation)
+    return [other for other in linked if other not in session.deleted]
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_updated_at(session, flush_context, instances):
+    """Met à jour updated_at des fiches dont les ressources, tags ou liens changent,
+    ou dont une fiche liée affichée sur leur page change, et recopie leurs DomainTag
+    dans la colonne domains.
+
+    updated_at sert de validateur HTTP (ETag / Last-Modified) : il doit bouger
+    dès que la représentation détaillée d'une fiche change, y compris pour les deux
+    extrémités d'un lien whistleblower_cases ou case_entities.
+    """
+    now = datetime.utcnow()
+    touched = set()
+    retagged = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Resource, DomainTag)):
+            owners = _owners(session, obj) + _previous_owners(session, obj)
+            touched.update(owners)
+            if isinstance(obj, DomainTag):
+                retagged.update(owners)
+            continue
+        if isinstance(obj, (Whistleblower, Case, Entity)):
+            touched.update(_linked_pages(session, obj))
+        if isinstance(obj, (Whistleblower, Case)) and obj not in session.deleted:
+            if obj in session.dirty and session.is_modified(obj):
+                obj.updated_at = now
+            if "domain_tags" in obj.__dict__ and attributes.get_history(obj, "domain_tags").has_changes():
+                retagged.add(obj)
+    
+    for parent in touched:
+        parent.updated_at = now
+    
+    # Tags créés ou rattachés à une autre fiche : les collections chargées ne le reflètent pas encore
+    pending = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, DomainTag)]
+    for parent in retagged:
+        tags = [t for t in parent.domain_tags if t not in session.deleted and parent in _owners(session, t)]
+        tags += [t for t in pending if t not in tags and parent in _owners(session, t)]
+        tags.sort(key=lambda t: (t.id is None, t.id or 0))
+        parent.domains = [t.domain for t in tags]
@@ -0,0 +1,36 @@
+"""
+Sentinelles - Pagination par curseur (keyset)
+Ordre déterministe (is_featured, revelation_year, id) décroissant
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+from models import listing_order
+
+
+def sort_key(obj) -> list:
+    """Valeurs de tri d'une ligne, cohérentes avec listing_order"""
+    return [bool(obj.is_featured), obj.revelation_year or 0, obj.id]
+
+
+def encode_cursor(obj) -> str:
+    raw = json.dumps(sort_key(obj), separators=(",", ":")).encode()
+    return urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        featured, year, pk = json.loads(raw)
+        return [bool(featured), int(year), int(pk)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def apply_cursor(query, model, cursor: str):
+    """Restreint la requête aux lignes qui suivent le curseur dans l'ordre de listing_order"""
+    return query.filter(tuple_(*listing_order(model)) < tuple_(*decode_cursor(cursor)))
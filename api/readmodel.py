@@ -0,0 +1,286 @@
+"""
+Sentinelles - Modèle de lecture en mémoire
+Instantané immuable du catalogue vérifié : index par id et slug, index inversés (domaines,
+statut), ordre de listing précalculé et corps JSON des fiches déjà encodés. Un rechargement
+construit un nouvel instantané à part puis le substitue d'un bloc à l'ancien.
+"""
+
+from bisect import bisect_right
+from threading import Lock, Thread
+import logging
+import os
+import re
+import time
+import unicodedata
+
+from cache import LRUCache
+from pagination import decode_cursor, sort_key as listing_key
+
+
+READ_MODEL_TTL = float(os.getenv("READ_MODEL_TTL", "300"))
+# Délai (s) avant une nouvelle tentative après un rechargement en échec
+READ_MODEL_RETRY_DELAY = 10
+
+logger = logging.getLogger("sentinelles.readmodel")
+
+
+def normalize(text) -> str:
+    """Texte comparable sans casse ni accents (équivalent de unaccent + lower)"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def text_matcher(q: str):
+    """Prédicat de recherche en mémoire : chaque mot de `q` doit commencer un mot du texte normalisé.
+
+    Approche la recherche plein texte PostgreSQL (mots entiers, racines) mieux qu'une sous-chaîne.
+    """
+    words = [(word, re.compile(r"\b" + re.escape(word))) for word in normalize(q).split()]
+    # Test de sous-chaîne d'abord : il écarte presque toutes les fiches sans passer par la regex
+    return lambda text: all(word in text and pattern.search(text) for word, pattern in words)
+
+
+class Record:
+    """Fiche en mémoire : clés d'index et de tri, élément de liste et corps JSON de la fiche détaillée"""
+
+    __slots__ = (
+        "id", "slug", "name", "is_featured", "revelation_year", "updated_at", "sort_key",
+        "keys", "facets", "name_key", "text", "snippet", "item", "body",
+    )
+
+    def __init__(self, id, slug, name, *, is_featured=False, revelation_year=None, updated_at=None,
+                 sort_key=None, keys=None, facets=None, text="", snippet=None, item=None, body=b""):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.is_featured = is_featured
+        self.revelation_year = revelation_year
+        self.updated_at = updated_at
+        self.sort_key = sort_key if sort_key is not None else tuple(listing_key(self))
+        self.keys = keys or {}
+        self.facets = facets or {}
+        self.name_key = normalize(name)
+        self.text = text
+        self.snippet = snippet
+        self.item = item
+        self.body = body
+
+
+class Collection:
+    """Fiches d'un type dans l'ordre de listing, avec index par id, slug et valeurs de `keys`"""
+
+    def __init__(self, records, descending: bool = True):
+        self.ordered = tuple(sorted(records, key=lambda r: r.sort_key, reverse=descending))
+        self.by_id = {r.id: r for r in self.ordered}
+        self.by_slug = {r.slug: r for r in self.ordered}
+        self.last_modified = max((r.updated_at for r in self.ordered if r.updated_at is not None), default=None)
+        # Les fiches mises en avant sont en tête de l'ordre de listing (is_featured décroissant)
+        self.featured_count = sum(1 for r in self.ordered if r.is_featured)
+
+        # Index inversés : champ -> valeur -> positions (croissantes) dans self.ordered
+        self.index = {}
+        for position, record in enumerate(self.ordered):
+            for field, values in record.keys.items():
+                if not isinstance(values, (list, tuple)):
+                    values = (values,)
+                for value in values:
+                    self.index.setdefault(field, {}).setdefault(value, []).append(position)
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def get(self, identifier: str):
+        if identifier.isdigit():
+            return self.by_id.get(int(identifier))
+        return self.by_slug.get(identifier)
+
+    def featured(self) -> tuple:
+        return self.ordered[:self.featured_count]
+
+    def select(self, filters=(), featured_only: bool = False, search: str = None) -> list:
+        """Fiches filtrées, dans l'ordre de listing.
+
+        `filters` : triplets (champ indexé, valeurs, toutes) ; une valeur quelconque suffit
+        sauf si `toutes` est vrai.
+        """
+        positions = None
+        for field, values, match_all in filters:
+            index = self.index.get(field, {})
+            sets = [set(index.get(value, ())) for value in values]
+            matched = set.intersection(*sets) if match_all and sets else set().union(*sets)
+            positions = matched if positions is None else positions & matched
+
+        if positions is None:
+            records = self.featured() if featured_only else self.ordered
+        else:
+            if featured_only:
+                positions = {p for p in positions if p < self.featured_count}
+            records = [self.ordered[p] for p in sorted(positions)]
+
+        if search:
+            matches = text_matcher(search)
+            records = [r for r in records if matches(r.text)]
+        return records
+
+    def page(self, records: list, cursor: str = None, offset: int = 0, limit: int = 50) -> list:
+        """Page de `records` après le curseur (même ordre que pagination.apply_cursor) ou à l'offset"""
+        if cursor:
+            after = tuple(decode_cursor(cursor))
+            start = bisect_right(records, _descending(after), key=lambda r: _descending(r.sort_key))
+            return records[start:start + limit]
+        return records[offset:offset + limit]
+
+    def search(self, q: str, limit: int = None) -> list:
+        """Fiches correspondant à la recherche, celles dont le nom correspond en premier"""
+        matches = text_matcher(q)
+        records = [r for r in self.ordered if matches(r.text)]
+        records.sort(key=lambda r: not matches(r.name_key))
+        return records if limit is None else records[:limit]
+
+
+def _descending(key: tuple) -> tuple:
+    """Clé croissante équivalente à l'ordre décroissant de (is_featured, revelation_year, id)"""
+    return tuple(-int(value) for value in key)
+
+
+def count_facets(records, names: tuple) -> dict:
+    """Comptes par valeur de facette, triés comme search.search_results"""
+    counts = {name: {} for name in names}
+    for record in records:
+        for name in names:
+            values = record.facets.get(name)
+            if not isinstance(values, (list, tuple)):
+                values = (values,)
+            for value in values:
+                if value is not None:
+                    counts[name][value] = counts[name].get(value, 0) + 1
+    return {
+        name: dict(sorted(values.items(), key=lambda item: (-item[1], item[0])))
+        for name, values in counts.items()
+    }
+
+
+class Snapshot:
+    """Catalogue complet à un instant donné ; jamais modifié après construction"""
+
+    __slots__ = ("whistleblowers", "cases", "entities", "stats", "domains", "loaded_at", "results")
+
+    def __init__(self, whistleblowers: Collection, cases: Collection, entities: Collection,
+                 stats: dict, domains: list):
+        self.whistleblowers = whistleblowers
+        self.cases = cases
+        self.entities = entities
+        self.stats = stats
+        self.domains = domains
+        self.loaded_at = time.monotonic()
+        # Résultats de recherche et suggestions calculés sur cet instantané (remplacés avec lui)
+        self.results = LRUCache(maxsize=2048)
+
+    def summary(self) -> str:
+        return (f"{len(self.whistleblowers)} lanceurs d'alerte, {len(self.cases)} affaires, "
+                f"{len(self.entities)} entités")
+
+    def suggest(self, q: str, limit: int) -> list:
+        """Même classement que search.suggest hors PostgreSQL : préfixe d'abord, puis nom"""
+        key = ("suggest", normalize(q.strip()), limit)
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached
+
+        needle = key[1]
+        matches = []
+        for kind, collection in (("whistleblower", self.whistleblowers), ("case", self.cases),
+                                 ("entity", self.entities)):
+            for record in collection.ordered:
+                if needle in record.name_key:
+                    score = 1.0 if record.name_key.startswith(needle) else 0.0
+                    matches.append((-score, record.name, kind, record))
+        matches.sort(key=lambda m: (m[0], m[1]))
+        result = [{"id": r.id, "slug": r.slug, "name": r.name, "type": kind} for _, _, kind, r in matches[:limit]]
+        self.results.set(key, result)
+        return result
+
+
+class ReadModel:
+    """Détient l'instantané courant et le reconstruit en arrière-plan après invalidation ou expiration.
+
+    Les lecteurs prennent une référence à l'instantané courant : le remplacement est une simple
+    affectation, ils ne voient jamais un catalogue à moitié chargé. Pendant un rechargement,
+    l'ancien instantané continue d'être servi. Sert aussi au graphe des relations (graph.py) :
+    `loader` renvoie tout objet ayant `loaded_at` et `summary()`.
+    """
+
+    def __init__(self, loader, ttl: float = READ_MODEL_TTL, name: str = "Modèle de lecture"):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._snapshot = None
+        self._generation = 0
+        self._loaded_generation = -1
+        self._refreshing = False
+        self._retry_at = 0.0
+        self._lock = Lock()
+        self._first_load_lock = Lock()
+
+    def load(self) -> Snapshot:
+        """Charge un instantané et le publie ; appel bloquant (démarrage, scripts)"""
+        with self._lock:
+            generation = self._generation
+        started = time.perf_counter()
+        snapshot = self.loader()
+        self._snapshot = snapshot
+        with self._lock:
+            self._loaded_generation = max(self._loaded_generation, generation)
+        logger.info("%s chargé en %.0f ms (%s)", self.name, (time.perf_counter() - started) * 1000, snapshot.summary())
+        return snapshot
+
+    @property
+    def current(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._first_load()
+        expired = self.ttl and time.monotonic() - snapshot.loaded_at > self.ttl
+        if expired or self._loaded_generation != self._generation:
+            self._refresh_in_background()
+        return snapshot
+
+    def _first_load(self) -> Snapshot:
+        # Premières requêtes simultanées : un seul chargement, les autres attendent son résultat
+        with self._first_load_lock:
+            if self._snapshot is None:
+                self.load()
+        return self._snapshot
+
+    @property
+    def age(self):
+        """Âge (s) de l'instantané publié, None avant le premier chargement"""
+        snapshot = self._snapshot
+        return time.monotonic() - snapshot.loaded_at if snapshot is not None else None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or time.monotonic() < self._retry_at:
+                return
+            self._refreshing = True
+        Thread(target=self._refresh, name="read-model-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            # Une invalidation pendant le chargement relance un chargement complet
+            while True:
+                self.load()
+                with self._lock:
+                    if self._loaded_generation == self._generation:
+                        break
+        except Exception:
+            self._retry_at = time.monotonic() + READ_MODEL_RETRY_DELAY
+            logger.exception("Échec du rechargement (%s), l'ancien instantané reste servi", self.name)
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,379 @@
+"""
+Sentinelles - Recherche plein texte et suggestions
+Colonnes tsvector générées (configuration française + unaccent), index GIN
+et index trigrammes (pg_trgm) pour l'autocomplétion ; équivalents en mémoire pour readmodel
+"""
+
+from sqlalchemy import (
+    Integer, String, or_, func, literal, literal_column, text, case, cast, null, true, tuple_, union_all, select
+)
+
+from cache import LRUCache
+from models import Whistleblower, Case, Entity, on_catalog_change
+from readmodel import normalize
+
+TS_CONFIG = "sentinelles_fr"
+
+# Champs indexés par modèle, avec leur poids ts_rank (A > B > C)
+SEARCH_FIELDS = {
+    Whistleblower: [("name", "A"), ("main_revelation", "B"), ("summary", "C")],
+    Case: [("name", "A"), ("short_name", "A"), ("summary", "C")],
+    Entity: [("name", "A"), ("description", "C")],
+}
+
+# Colonnes utilisées par le repli ilike (SQLite, bases de test)
+FALLBACK_FIELDS = {
+    Whistleblower: ["name", "main_revelation"],
+    Case: ["name", "summary"],
+    Entity: ["name"],
+}
+
+# Colonne source des extraits surlignés
+SNIPPET_FIELDS = {
+    Whistleblower: "summary",
+    Case: "summary",
+    Entity: "description",
+}
+
+# Types renvoyés par /search/suggest
+SUGGEST_TYPES = {
+    Whistleblower: "whistleblower",
+    Case: "case",
+    Entity: "entity",
+}
+
+# Clés des totaux et facettes dans la réponse de /search
+RESULT_KEYS = {
+    Whistleblower: "whistleblowers",
+    Case: "cases",
+    Entity: "entities",
+}
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, ShortWord=3"
+
+
+def is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def _vector_sql(model) -> str:
+    parts = [
+        f"setweight(to_tsvector('{TS_CONFIG}'::regconfig, coalesce({field}, '')), '{weight}')"
+        for field, weight in SEARCH_FIELDS[model]
+    ]
+    return " || ".join(parts)
+
+
+def install_search(engine):
+    """Crée la configuration texte, les colonnes search_vector et les index GIN (PostgreSQL uniquement)"""
+    if not is_postgres(engine):
+        return
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        conn.execute(text(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{TS_CONFIG}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {TS_CONFIG} (COPY = french);
+                    ALTER TEXT SEARCH CONFIGURATION {TS_CONFIG}
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+                END IF;
+            END
+            $$
+        """))
+        for model in SEARCH_FIELDS:
+            table = model.__tablename__
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ({_vector_sql(model)}) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+            ))
+
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for model in SUGGEST_TYPES:
+            table = model.__tablename__
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_name_trgm ON {table} USING GIN (lower(name) gin_trgm_ops)"
+            ))
+
+
+def _ts_query(q: str):
+    return func.websearch_to_tsquery(literal_column(f"'{TS_CONFIG}'::regconfig"), q)
+
+
+def _search_vector(model):
+    return literal_column(f"{model.__tablename__}.search_vector")
+
+
+def search_filter(bind, model, q: str):
+    """Condition WHERE de recherche : tsvector @@ tsquery, ou ilike hors PostgreSQL"""
+    if is_postgres(bind):
+        return _search_vector(model).op("@@")(_ts_query(q))
+    return or_(*[getattr(model, field).ilike(f"%{q}%") for field in FALLBACK_FIELDS[model]])
+
+
+def search_rank(bind, model, q: str):
+    """Score de pertinence ts_rank, ou None hors PostgreSQL"""
+    if is_postgres(bind):
+        return func.ts_rank(_search_vector(model), _ts_query(q))
+    return None
+
+
+def search_snippet(bind, model, q: str):
+    """Extrait surligné (<mark>) via ts_headline, ou le début du texte hors PostgreSQL"""
+    column = getattr(model, SNIPPET_FIELDS[model])
+    if is_postgres(bind):
+        return func.ts_headline(
+            literal_column(f"'{TS_CONFIG}'::regconfig"), func.coalesce(column, ""), _ts_query(q), HEADLINE_OPTIONS
+        )
+    return func.substr(column, 1, 200)
+
+
+def apply_search(query, bind, model, q: str):
+    """Filtre une requête ORM et la trie par pertinence quand c'est possible"""
+    query = query.filter(search_filter(bind, model, q))
+    rank = search_rank(bind, model, q)
+    if rank is not None:
+        query = query.order_by(rank.desc())
+    return query
+
+
+# Nombre de résultats par type renvoyés par /search
+HIT_LIMITS = {
+    Whistleblower: 10,
+    Case: 10,
+    Entity: 5,
+}
+
+
+def _hit_select(bind, model, q: str, limit: int):
+    """SELECT (kind, 'hit', NULL, rang, id, slug, name, snippet) des meilleurs résultats d'un modèle
+
+    Les `limit` meilleurs ids sont choisis d'abord : l'extrait (ts_headline, coûteux) n'est calculé que pour eux.
+    """
+    rank = search_rank(bind, model, q)
+    best = select(model.id, (rank if rank is not None else literal(0)).label("rank"))
+    best = best.where(search_filter(bind, model, q))
+    if hasattr(model, "is_verified"):
+        best = best.where(model.is_verified == True)
+    best = best.order_by(*((rank.desc(),) if rank is not None else ()), model.id).limit(limit).subquery()
+    return (
+        select(
+            literal(RESULT_KEYS[model]).label("kind"),
+            literal("hit").label("facet"),
+            cast(null(), String).label("value"),
+            func.row_number().over(order_by=(best.c.rank.desc(), model.id)).label("n"),
+            model.id.label("id"),
+            model.slug.label("slug"),
+            model.name.label("name"),
+            search_snippet(bind, model, q).label("snippet"),
+        )
+        .join_from(model, best, model.id == best.c.id)
+    )
+
+
+# ==================== SUGGESTIONS ====================
+
+suggest_cache = LRUCache(maxsize=2048, ttl=60)
+
+
+@on_catalog_change
+def _invalidate_suggestions(change):
+    # Noms et statut de vérification seulement : ressources, tags et liens n'y changent rien
+    if change.affects("whistleblowers", "cases", "entities"):
+        suggest_cache.clear()
+
+
+def _suggest_select(bind, model, q: str):
+    name = func.lower(model.name)
+    prefix = name.startswith(q.lower(), autoescape=True)
+    if is_postgres(bind):
+        matches = or_(prefix, literal(q.lower()).op("<%")(name))
+        score = func.word_similarity(q.lower(), name) + case((prefix, 1.0), else_=0.0)
+    else:
+        matches = name.contains(q.lower(), autoescape=True)
+        score = case((prefix, 1.0), else_=0.0)
+
+    stmt = select(
+        literal(SUGGEST_TYPES[model]).label("type"),
+        model.id.label("id"),
+        model.slug.label("slug"),
+        model.name.label("name"),
+        score.label("score"),
+    ).where(matches)
+    if hasattr(model, "is_verified"):
+        stmt = stmt.where(model.is_verified == True)
+    return stmt
+
+
+def suggest(db, q: str, limit: int):
+    """Suggestions par préfixe et similarité trigramme sur les noms, en une seule requête"""
+    key = (q.strip().lower(), limit)
+    cached = suggest_cache.get(key)
+    if cached is not None:
+        return cached
+
+    bind = db.get_bind()
+    q = q.strip()
+    union = union_all(*[_suggest_select(bind, model, q) for model in SUGGEST_TYPES]).subquery()
+    rows = db.execute(
+        select(union).order_by(union.c.score.desc(), union.c.name).limit(limit)
+    ).all()
+
+    result = [{"id": r.id, "slug": r.slug, "name": r.name, "type": r.type} for r in rows]
+    suggest_cache.set(key, result)
+    return result
+
+
+# ==================== FACETTES ====================
+
+facets_cache = LRUCache(maxsize=1024, ttl=60)
+
+
+@on_catalog_change
+def _invalidate_facets(change):
+    # Les domaines sont lus dans la colonne dénormalisée domains, mise à jour avec les tags
+    if change.affects("whistleblowers", "cases", "entities"):
+        facets_cache.clear()
+
+
+def _decade(column):
+    return (column // 10) * 10
+
+
+# Facettes scalaires comptées sur les résultats de la recherche, par modèle
+FACET_COLUMNS = {
+    Whistleblower: {"status": Whistleblower.status, "decade": _decade(Whistleblower.revelation_year)},
+    Case: {"status": Case.status, "revealer_type": Case.revealer_type, "decade": _decade(Case.revelation_year)},
+    Entity: {"country": Entity.country},
+}
+
+# Modèles dont la colonne domains (tableau dénormalisé) donne la facette « domain »
+DOMAIN_FACET_MODELS = (Whistleblower, Case)
+
+FACET_NAMES = {
+    RESULT_KEYS[model]: (("domain",) if model in DOMAIN_FACET_MODELS else ()) + tuple(columns)
+    for model, columns in FACET_COLUMNS.items()
+}
+
+
+def _facet_selects(bind, model, q: str) -> list:
+    """SELECT (kind, facet, value, n) d'un modèle : total et facettes scalaires, puis domaines"""
+    kind = RESULT_KEYS[model]
+    columns = {name: expr.label(name) for name, expr in FACET_COLUMNS[model].items()}
+    if model in DOMAIN_FACET_MODELS:
+        columns["domains"] = model.domains.label("domains")
+    matches = select(*columns.values()).where(search_filter(bind, model, q))
+    if hasattr(model, "is_verified"):
+        matches = matches.where(model.is_verified == True)
+    matches = matches.cte(f"{kind}_matches")
+    scalars = [name for name in columns if name != "domains"]
+
+    if is_postgres(bind):
+        # Un seul GROUP BY GROUPING SETS ((status), (decade), ..., ()) : () donne le total
+        facet = case(
+            *[(func.grouping(matches.c[name]) == 0, literal(name)) for name in scalars], else_=literal("total")
+        )
+        value = func.coalesce(*[cast(matches.c[name], String) for name in scalars])
+        selects = [
+            select(literal(kind).label("kind"), facet.label("facet"), value.label("value"), func.count().label("n"))
+            .select_from(matches)
+            .group_by(func.grouping_sets(*[tuple_(matches.c[name]) for name in scalars], tuple_()))
+        ]
+    else:
+        selects = [
+            select(literal(kind), literal("total"), null(), func.count()).select_from(matches)
+        ] + [
+            select(literal(kind), literal(name), cast(matches.c[name], String), func.count())
+            .select_from(matches).group_by(matches.c[name])
+            for name in scalars
+        ]
+
+    if "domains" in columns:
+        # Une ligne par (fiche, domaine) : unnest du tableau PostgreSQL, json_each sous SQLite
+        if is_postgres(bind):
+            # unnest(...) AS alias(value) : sans liste de colonnes, PostgreSQL nomme la colonne d'après l'alias
+            each = func.unnest(matches.c.domains).table_valued("value").render_derived()
+        else:
+            each = func.json_each(matches.c.domains).table_valued("value")
+        selects.append(
+            select(literal(kind), literal("domain"), each.c.value, func.count())
+            .select_from(matches).join(each, true()).group_by(each.c.value)
+        )
+    return selects
+
+
+# Colonnes des résultats, vides sur les lignes de facettes (même forme pour l'UNION ALL)
+NO_HIT = (
+    cast(null(), Integer).label("id"),
+    cast(null(), String).label("slug"),
+    cast(null(), String).label("name"),
+    cast(null(), String).label("snippet"),
+)
+
+
+def search_results(db, q: str, facets: bool = False) -> tuple:
+    """(résultats par type, totaux et facettes ou None) de /search, en une seule requête (UNION ALL)
+
+    Les facettes en cache ne sont pas recalculées : seuls les résultats sont alors demandés.
+    """
+    bind = db.get_bind()
+    key = q.strip().lower()
+    cached = facets_cache.get(key) if facets else None
+    selects = [_hit_select(bind, model, q, limit) for model, limit in HIT_LIMITS.items()]
+    if facets and cached is None:
+        selects += [stmt.add_columns(*NO_HIT) for model in RESULT_KEYS for stmt in _facet_selects(bind, model, q.strip())]
+
+    hits = {kind: [] for kind in RESULT_KEYS.values()}
+    totals = {kind: 0 for kind in RESULT_KEYS.values()}
+    groups = {kind: {} for kind in RESULT_KEYS.values()}
+    for row in db.execute(union_all(*selects)).all():
+        if row.facet == "hit":
+            hits[row.kind].append(row)
+        elif row.facet == "total":
+            totals[row.kind] = row.n
+        elif row.value is not None:
+            groups[row.kind].setdefault(row.facet, {})[row.value] = row.n
+    for rows in hits.values():
+        rows.sort(key=lambda row: row.n)
+
+    if not facets or cached is not None:
+        return hits, cached
+    for kind, counts_by_facet in groups.items():
+        for facet in FACET_NAMES[kind]:
+            counts = counts_by_facet.get(facet, {})
+            counts_by_facet[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+    result = {"totals": totals, "facets": groups}
+    facets_cache.set(key, result)
+    return hits, result
+
+
+# ==================== MODÈLE DE LECTURE ====================
+
+def record_text(obj) -> str:
+    """Texte recherché en mémoire : champs de SEARCH_FIELDS, sans casse ni accents"""
+    return normalize(" ".join(getattr(obj, field) or "" for field, _ in SEARCH_FIELDS[type(obj)]))
+
+
+def record_snippet(obj):
+    """Extrait renvoyé par /search en mémoire, comme search_snippet hors PostgreSQL"""
+    value = getattr(obj, SNIPPET_FIELDS[type(obj)])
+    return value[:200] if value is not None else None
+
+
+def record_facets(obj) -> dict:
+    """Valeurs des facettes d'une fiche, au format de search_facets (valeurs texte)"""
+    model = type(obj)
+    facets = {}
+    for name in FACET_COLUMNS[model]:
+        if name == "decade":
+            value = obj.revelation_year // 10 * 10 if obj.revelation_year is not None else None
+        else:
+            value = getattr(obj, name)
+        facets[name] = str(value) if value is not None else None
+    if model in DOMAIN_FACET_MODELS:
+        facets["domain"] = tuple(obj.domains or ())
+    return facets
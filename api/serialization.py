@@ -0,0 +1,71 @@
+"""
+Sentinelles - Sérialisation rapide des réponses
+Dictionnaires construits champ par champ (sans copie de __dict__) et encodés par orjson,
+sans seconde validation pydantic par response_model
+"""
+
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Text, case, func
+
+EXCERPT_LENGTH = 300
+
+
+def schema_fields(schema, *computed) -> tuple:
+    """Champs d'un schéma lus tels quels sur l'objet, hors champs calculés"""
+    return tuple(name for name in schema.model_fields if name not in computed)
+
+
+def pick(obj, fields: tuple) -> dict:
+    return {name: getattr(obj, name) for name in fields}
+
+
+def sql_excerpt(column, length: int = EXCERPT_LENGTH):
+    """Extrait du résumé calculé par la base : le texte complet ne quitte pas le serveur SQL"""
+    return case(
+        (func.length(column) > length, func.substr(column, 1, length, type_=Text).concat("...")),
+        else_=column
+    )
+
+
+def excerpt(text: Optional[str], length: int = EXCERPT_LENGTH) -> Optional[str]:
+    """Même extrait que sql_excerpt, calculé en Python (modèle de lecture en mémoire)"""
+    if text is not None and len(text) > length:
+        return text[:length] + "..."
+    return text
+
+
+def parse_fields(fields: Optional[str], allowed: tuple) -> tuple:
+    """Projection demandée via ?fields=a,b,c (toutes les colonnes de `allowed` par défaut)"""
+    if not fields:
+        return allowed
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Champs inconnus : {', '.join(unknown) or fields}")
+    return requested
+
+
+def fast_response(content, response: Response = None) -> ORJSONResponse:
+    """Réponse encodée par orjson ; reprend les en-têtes posés sur `response` (ETag, curseur...)"""
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
+
+
+def encode(content) -> bytes:
+    """Encodage identique à celui de ORJSONResponse, pour les corps préparés à l'avance"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_object(entries) -> bytes:
+    """Objet JSON à partir de paires (clé, valeur déjà encodée), sans décoder les valeurs"""
+    return b"{" + b",".join(encode(str(key)) + b":" + body for key, body in entries) + b"}"
+
+
+def encoded_response(body: bytes, response: Response = None) -> Response:
+    """Réponse JSON déjà encodée par encode() ; reprend les en-têtes comme fast_response"""
+    headers = dict(response.headers) if response is not None else None
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,95 @@
+"""
+Sentinelles - Fixtures des tests de l'API
+Base SQLite jetable par test, catalogue de taille suffisante pour qu'un N+1 se voie
+dans le nombre de requêtes SQL.
+
+Usage (depuis api/) :
+    pip install -r tests/requirements.txt
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app  # noqa: E402
+from models import Whistleblower, Case, Entity, Resource, DomainTag  # noqa: E402
+from settings import Settings  # noqa: E402
+
+DOMAINS = ("surveillance", "finance", "santé", "défense")
+
+
+def seed_catalog(db, whistleblowers: int = 120, cases: int = 110, entities: int = 12):
+    """Fiches vérifiées avec ressources, tags de domaine et liens (lanceurs <-> affaires <-> entités)"""
+    entity_rows = [
+        Entity(slug=f"entite-{i}", name=f"Entité {i}", entity_type="entreprise", country="France")
+        for i in range(entities)
+    ]
+    case_rows = []
+    for i in range(cases):
+        case = Case(
+            slug=f"affaire-{i}", name=f"Affaire {i}", domain=DOMAINS[i % len(DOMAINS)],
+            revelation_year=1990 + i % 30, summary=f"Résumé de l'affaire {i}", is_featured=i % 10 == 0,
+            entities=[entity_rows[i % entities], entity_rows[(i + 1) % entities], entity_rows[(i + 2) % entities]],
+            resources=[Resource(resource_type="article", title=f"Article {i}-{j}") for j in range(3)],
+            domain_tags=[DomainTag(domain=DOMAINS[i % len(DOMAINS)]), DomainTag(domain=DOMAINS[(i + 1) % len(DOMAINS)])],
+        )
+        case_rows.append(case)
+    for i in range(whistleblowers):
+        db.add(Whistleblower(
+            slug=f"lanceur-{i}", name=f"Lanceur {i}", summary=f"Résumé du lanceur {i}",
+            revelation_year=1990 + i % 30, status="libre", is_featured=i % 10 == 0,
+            cases=[case_rows[i % cases], case_rows[(i + 1) % cases], case_rows[(i + 2) % cases]],
+            resources=[Resource(resource_type="livre", title=f"Livre {i}-{j}") for j in range(3)],
+            domain_tags=[DomainTag(domain=DOMAINS[i % len(DOMAINS)]), DomainTag(domain=DOMAINS[(i + 2) % len(DOMAINS)])],
+        ))
+    db.add_all(case_rows + entity_rows)
+    db.commit()
+
+
+class StatementCounter:
+    """Nombre d'instructions SQL envoyées au moteur depuis le dernier reset()"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return Settings(database_url=f"sqlite:///{tmp_path / 'sentinelles.db'}", pool_warmup=0, warm_caches=False)
+
+
+@pytest.fixture
+def client(settings):
+    app = create_app(settings)
+    with TestClient(app) as client:
+        db = app.state.database.SessionLocal()
+        try:
+            seed_catalog(db)
+        finally:
+            db.close()
+        yield client
+
+
+@pytest.fixture
+def statements(client):
+    return StatementCounter(client.app.state.database.engine)
+
+
+@pytest.fixture
+def session(client):
+    db = client.app.state.database.SessionLocal()
+    yield db
+    db.close()
@@ -0,0 +1,36 @@
+"""
+Applications indépendantes : chacune sa base, ses caches et ses callbacks de on_catalog_change
+"""
+
+from fastapi.testclient import TestClient
+
+import models
+from conftest import seed_catalog
+from main import create_app
+from settings import Settings
+
+
+def test_apps_with_different_settings_coexist(tmp_path):
+    listeners = list(models._change_listeners)
+    apps = {
+        size: create_app(Settings(
+            database_url=f"sqlite:///{tmp_path / f'sentinelles-{size}.db'}", pool_warmup=0, warm_caches=False
+        ))
+        for size in (4, 7)
+    }
+
+    with TestClient(apps[4]) as small, TestClient(apps[7]) as large:
+        for size, app in apps.items():
+            db = app.state.database.SessionLocal()
+            try:
+                seed_catalog(db, whistleblowers=size, cases=size, entities=3)
+            finally:
+                db.close()
+
+        assert small.get("/stats").json()["total_cases"] == 4
+        assert large.get("/stats").json()["total_cases"] == 7
+        assert len(small.get("/cases").json()) == 4
+        assert len(large.get("/cases").json()) == 7
+        assert len(models._change_listeners) == len(listeners) + 2
+
+    assert models._change_listeners == listeners
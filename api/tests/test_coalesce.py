@@ -0,0 +1,58 @@
+"""
+Coalescence des GET identiques : calcul partagé indépendant de la requête qui l'a lancé
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import Request
+
+from coalesce import SingleFlight, coalesce
+from models import Case
+
+
+def fake_request(app, route: str) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": route, "query_string": b"", "headers": [],
+        "app": app, "route": SimpleNamespace(path=route),
+    })
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight("test")
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def compute():
+            started.set()
+            await release.wait()
+            return 42
+
+        leader = asyncio.create_task(flight.run("key", compute))
+        await started.wait()
+        follower = asyncio.create_task(flight.run("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        return await follower
+
+    assert asyncio.run(scenario()) == 42
+
+
+def test_shared_computation_opens_its_own_session(client):
+    injected = client.app.state.database.SessionLocal()
+    sessions = []
+
+    def count_cases(session):
+        sessions.append(session)
+        return session.query(Case).count()
+
+    try:
+        assert asyncio.run(coalesce(fake_request(client.app, "/cases"), injected, count_cases)) == 110
+        assert asyncio.run(coalesce(fake_request(client.app, "/stats"), injected, count_cases)) == 110
+    finally:
+        injected.close()
+
+    shared, direct = sessions
+    assert shared is not injected
+    assert direct is injected
@@ -0,0 +1,152 @@
+"""
+Colonne dénormalisée domains : filtres (PostgreSQL et SQLite) et synchronisation avec les DomainTag
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import Base, Whistleblower, Case, DomainTag, domains_filter, ensure_domains
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.mark.parametrize("match_all, operator", [(False, "&&"), (True, "@>")])
+@pytest.mark.parametrize("model", [Whistleblower, Case])
+def test_domains_filter_compiles_for_postgresql(model, match_all, operator):
+    engine = create_engine("postgresql+psycopg2://sentinelles@localhost/sentinelles")
+    query = select(model.id).where(domains_filter(model, engine, ["finance", "santé"], match_all))
+
+    sql = str(query.compile(dialect=engine.dialect))
+    assert f"{model.__tablename__}.domains {operator}" in sql
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("/whistleblowers?domain=finance&limit=100&fields=slug", {"finance"}),
+    ("/whistleblowers?domains=finance,santé&limit=100&fields=slug", {"finance", "santé"}),
+    ("/cases?domains=finance,santé&domains_match=all&limit=100&fields=slug", {"finance", "santé"}),
+])
+def test_domains_filters_run(client, session, url, expected):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    slugs = {item["slug"] for item in response.json()}
+    assert slugs
+
+    model = Case if url.startswith("/cases") else Whistleblower
+    for record in session.query(model).filter(model.slug.in_(slugs)):
+        domains = set(record.domains)
+        assert domains >= expected if "domains_match=all" in url else domains & expected
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL non défini (base PostgreSQL jetable)")
+def test_domains_filters_run_on_postgresql():
+    from fastapi.testclient import TestClient
+
+    from conftest import seed_catalog
+    from main import create_app
+    from settings import Settings
+
+    app = create_app(Settings(database_url=POSTGRES_URL, pool_warmup=0, warm_caches=False))
+    with TestClient(app) as client:
+        engine = app.state.database.engine
+        db = app.state.database.SessionLocal()
+        try:
+            seed_catalog(db)
+            for url in ("/whistleblowers?domain=finance", "/whistleblowers?domains=finance,santé",
+                        "/cases?domains=finance,santé&domains_match=all"):
+                response = client.get(url)
+                assert response.status_code == 200, response.text
+                assert response.json()
+        finally:
+            db.close()
+            Base.metadata.drop_all(engine)
+
+
+def tags_of(db, slug: str) -> list:
+    db.expire_all()
+    return db.query(Whistleblower).filter(Whistleblower.slug == slug).one().domains
+
+
+@pytest.mark.parametrize("move", ["foreign_key", "relationship"])
+def test_moving_a_tag_retags_both_owners(session, move):
+    source = session.query(Whistleblower).filter(Whistleblower.slug == "lanceur-1").one()
+    target = session.query(Whistleblower).filter(Whistleblower.slug == "lanceur-2").one()
+    before_source, before_target = list(source.domains), list(target.domains)
+    tag = session.query(DomainTag).filter(DomainTag.whistleblower_id == source.id).order_by(DomainTag.id).first()
+    session.expire_all()
+
+    tag = session.get(DomainTag, tag.id)
+    if move == "foreign_key":
+        tag.whistleblower_id = target.id
+    else:
+        tag.whistleblower = session.get(Whistleblower, target.id)
+    session.commit()
+
+    assert tags_of(session, "lanceur-1") == before_source[1:]
+    assert sorted(tags_of(session, "lanceur-2")) == sorted(before_target + [tag.domain])
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL non défini (base PostgreSQL jetable)")
+def test_sql_writes_to_domain_tags_resync_domains_on_postgresql():
+    engine = create_engine(POSTGRES_URL)
+    tags = DomainTag.__table__
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as db:
+            db.add_all([
+                Whistleblower(slug="a", name="A", summary="Résumé", domain_tags=[DomainTag(domain="finance")]),
+                Whistleblower(slug="b", name="B", summary="Résumé"),
+                Case(slug="c", name="C", summary="Résumé", domain="santé", revelation_year=2020),
+            ])
+            db.commit()
+            a, b, c = (db.query(m).filter(m.slug == slug).one() for m, slug in (
+                (Whistleblower, "a"), (Whistleblower, "b"), (Case, "c"),
+            ))
+            a_id, b_id, c_id = a.id, b.id, c.id
+
+        with engine.begin() as conn:
+            # Divergence antérieure aux triggers : rattrapée à leur création
+            conn.execute(update(Whistleblower.__table__).where(Whistleblower.id == a_id).values(domains=[]))
+        ensure_domains(engine)
+        ensure_domains(engine)
+
+        def domains(model, owner_id):
+            with engine.connect() as conn:
+                return conn.execute(select(model.domains).where(model.id == owner_id)).scalar_one()
+
+        assert domains(Whistleblower, a_id) == ["finance"]
+
+        with engine.begin() as conn:
+            conn.execute(insert(tags), [
+                {"whistleblower_id": a_id, "case_id": None, "domain": "santé"},
+                {"whistleblower_id": b_id, "case_id": None, "domain": "défense"},
+                {"whistleblower_id": None, "case_id": c_id, "domain": "santé"},
+            ])
+        assert domains(Whistleblower, a_id) == ["finance", "santé"]
+        assert domains(Whistleblower, b_id) == ["défense"]
+        assert domains(Case, c_id) == ["santé"]
+
+        # Déplacement : les deux fiches sont recalculées
+        with engine.begin() as conn:
+            conn.execute(update(tags).where(tags.c.domain == "finance").values(whistleblower_id=b_id))
+        assert domains(Whistleblower, a_id) == ["santé"]
+        assert sorted(domains(Whistleblower, b_id)) == ["défense", "finance"]
+
+        with engine.begin() as conn:
+            conn.execute(delete(tags).where(tags.c.whistleblower_id == b_id))
+            conn.execute(delete(tags).where(tags.c.case_id == c_id))
+        assert domains(Whistleblower, b_id) == []
+        assert domains(Case, c_id) == []
+
+        # Écriture par l'ORM : toujours cohérente avec les triggers
+        with Session(engine) as db:
+            a = db.get(Whistleblower, a_id)
+            a.domain_tags.append(DomainTag(domain="finance"))
+            db.commit()
+        assert domains(Whistleblower, a_id) == ["santé", "finance"]
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
@@ -0,0 +1,73 @@
+"""
+Validateurs des pages détaillées : une modification d'une fiche liée, ou d'un lien,
+doit changer l'ETag des pages qui l'affichent
+"""
+
+import pytest
+
+from importer import import_records
+from models import Whistleblower, Case, Entity
+
+
+def revalidate(client, url: str, etag: str) -> int:
+    return client.get(url, headers={"If-None-Match": etag}).status_code
+
+
+def one(session, model, slug: str):
+    return session.query(model).filter(model.slug == slug).one()
+
+
+def link(session, model, slug: str, relation: str, other_model, other_slug: str, remove: bool = False):
+    # la fiche doit rester référencée pendant la modification de sa collection
+    obj = one(session, model, slug)
+    collection = getattr(obj, relation)
+    other = one(session, other_model, other_slug)
+    collection.remove(other) if remove else collection.append(other)
+
+
+@pytest.mark.parametrize("url, change", [
+    # nom d'une affaire liée, affiché dans related_cases
+    ("/whistleblowers/lanceur-5", lambda s: setattr(one(s, Case, "affaire-5"), "name", "Affaire renommée")),
+    # statut d'un lanceur d'alerte, affiché sur la page de l'affaire
+    ("/cases/affaire-5", lambda s: setattr(one(s, Whistleblower, "lanceur-5"), "status", "exilé")),
+    # entité renommée, affichée dans entities[]
+    ("/cases/affaire-5", lambda s: setattr(one(s, Entity, "entite-5"), "name", "Entité renommée")),
+    # lien ajouté depuis l'autre côté
+    ("/cases/affaire-50", lambda s: link(s, Whistleblower, "lanceur-5", "cases", Case, "affaire-50")),
+    ("/whistleblowers/lanceur-5", lambda s: link(s, Case, "affaire-50", "whistleblowers", Whistleblower, "lanceur-5")),
+    # lien retiré depuis l'entité
+    ("/cases/affaire-5", lambda s: link(s, Entity, "entite-5", "cases", Case, "affaire-5", remove=True)),
+    # fiche liée supprimée
+    ("/whistleblowers/lanceur-5", lambda s: s.delete(one(s, Case, "affaire-6"))),
+])
+def test_related_changes_invalidate_detail_etag(client, session, url, change):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert revalidate(client, url, etag) == 304
+
+    change(session)
+    session.commit()
+
+    after = client.get(url)
+    assert after.json() != response.json()
+    assert after.headers["ETag"] != etag
+    assert revalidate(client, url, etag) == 200
+
+
+def test_unrelated_field_keeps_linked_etags(client, session):
+    etag = client.get("/whistleblowers/lanceur-5").headers["ETag"]
+
+    one(session, Case, "affaire-5").summary = "Résumé réécrit"
+    session.commit()
+
+    assert revalidate(client, "/whistleblowers/lanceur-5", etag) == 304
+
+
+def test_import_of_a_renamed_entity_invalidates_its_cases(client, session):
+    etag = client.get("/cases/affaire-5").headers["ETag"]
+    entity = one(session, Entity, "entite-5")
+
+    import_records(entities=[{"slug": entity.slug, "name": "Entité importée"}], bind=session.get_bind())
+
+    assert revalidate(client, "/cases/affaire-5", etag) == 200
@@ -0,0 +1,34 @@
+"""
+Graphe des relations : chargé à la première requête /graph*, jamais pendant le démarrage
+"""
+
+from dataclasses import replace
+
+from fastapi.testclient import TestClient
+
+from main import create_app
+
+
+def graph_state(client):
+    return client.get("/ready").json()["graph"]
+
+
+def test_graph_loads_on_first_request(client, statements):
+    assert graph_state(client) == {"loaded": False, "age_seconds": None}
+
+    response = client.get("/graph/neighbourhood?node=whistleblower:lanceur-1&depth=1")
+    assert response.status_code == 200, response.text
+    # lanceur-1 est lié aux affaires 1, 2 et 3
+    assert len(response.json()["nodes"]) == 4
+    assert graph_state(client)["loaded"]
+
+    statements.reset()
+    assert client.get("/graph/path?source=whistleblower:lanceur-1&target=entity:entite-3").status_code == 200
+    assert statements.count == 0
+
+
+def test_graph_can_be_disabled(settings):
+    app = create_app(replace(settings, graph_enabled=False))
+    with TestClient(app) as client:
+        assert client.get("/graph").status_code == 404
+        assert graph_state(client) is None
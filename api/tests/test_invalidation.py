@@ -0,0 +1,106 @@
+"""
+Invalidation des caches : diffusée au commit, jamais pour une écriture annulée ;
+entre workers, par les triggers NOTIFY (PostgreSQL)
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.pool import NullPool
+
+from cache import CachedValue
+from invalidation import install_invalidation, start_listener
+from models import Base, Whistleblower, on_catalog_change, remove_catalog_listener
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def changes(client):
+    received = []
+    on_catalog_change(received.append)
+    yield received
+    remove_catalog_listener(received.append)
+
+
+def total_whistleblowers(client) -> int:
+    return client.get("/stats").json()["total_whistleblowers"]
+
+
+def add_whistleblower(session):
+    session.add(Whistleblower(slug="nouveau", name="Nouveau", summary="Résumé", revelation_year=2020))
+    session.flush()
+
+
+def test_stats_change_after_commit(client, session, changes):
+    assert total_whistleblowers(client) == 120
+
+    add_whistleblower(session)
+    # Lue entre le flush et le commit, la valeur ne doit pas rester en cache
+    assert total_whistleblowers(client) == 120
+    assert changes == []
+
+    session.commit()
+    assert changes
+    assert total_whistleblowers(client) == 121
+
+
+def test_stats_unchanged_after_rollback(client, session, changes):
+    assert total_whistleblowers(client) == 120
+
+    add_whistleblower(session)
+    session.rollback()
+
+    assert changes == []
+    assert total_whistleblowers(client) == 120
+
+
+def wait_for(condition, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL non défini (base PostgreSQL jetable)")
+def test_listener_invalidates_on_writes_from_another_connection():
+    engine = create_engine(POSTGRES_URL)
+    Base.metadata.create_all(engine)
+    trigger = text("SELECT oid FROM pg_trigger WHERE tgname = 'whistleblowers_notify_change'")
+    cache = CachedValue(ttl=300)
+
+    def invalidate(change):
+        if change.affects("whistleblowers"):
+            cache.invalidate()
+
+    on_catalog_change(invalidate)
+    listener = None
+    try:
+        install_invalidation(engine)
+        with engine.connect() as conn:
+            installed = conn.execute(trigger).scalar_one()
+        # Redémarrage : les triggers existants sont conservés, pas recréés
+        install_invalidation(engine)
+        with engine.connect() as conn:
+            assert conn.execute(trigger).scalar_one() == installed
+
+        listener = start_listener(engine)
+        assert wait_for(lambda: listener._connections == 1)
+        cache.get(lambda: "calculé")
+        assert cache.warm
+
+        # Écriture hors ORM, sur une autre connexion (autre worker, psql, import)
+        with create_engine(POSTGRES_URL, poolclass=NullPool).begin() as conn:
+            conn.execute(insert(Whistleblower.__table__).values(slug="externe", name="Externe", summary="Résumé"))
+
+        assert wait_for(lambda: not cache.warm)
+    finally:
+        if listener is not None:
+            listener.stop()
+        remove_catalog_listener(invalidate)
+        Base.metadata.drop_all(engine)
+        engine.dispose()
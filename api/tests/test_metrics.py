@@ -0,0 +1,28 @@
+"""
+Chronométrage des routes : handler et sérialisation mesurés une seule fois par requête
+"""
+
+from fastapi.routing import APIRoute
+
+
+def server_timing(response) -> dict:
+    timings = {}
+    for entry in response.headers["Server-Timing"].split(","):
+        name, _, rest = entry.strip().partition(";")
+        timings[name] = float(rest.split(";")[0].removeprefix("dur="))
+    return timings
+
+
+def test_endpoints_are_timed_once(client):
+    routes = [route for route in client.app.routes if isinstance(route, APIRoute)]
+    assert routes
+    for route in routes:
+        assert getattr(route.endpoint, "_timed", False), route.path
+        assert not getattr(route.endpoint.__wrapped__, "_timed", False), route.path
+
+
+def test_server_timing_splits_handler_and_serialization(client):
+    timings = server_timing(client.get("/whistleblowers?limit=100"))
+
+    assert timings["handler"] <= timings["total"]
+    assert timings["serialize"] > 0
@@ -0,0 +1,63 @@
+"""
+Nombre de requêtes SQL par route : fixe, quelle que soit la taille de la page ou des relations
+"""
+
+import pytest
+
+
+def count_statements(client, statements, url: str) -> int:
+    statements.reset()
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return statements.count
+
+
+@pytest.mark.parametrize("path", ["/whistleblowers", "/cases"])
+def test_list_query_count_does_not_depend_on_page_size(client, statements, path):
+    small = count_statements(client, statements, f"{path}?limit=1")
+    large = count_statements(client, statements, f"{path}?limit=100")
+
+    assert len(client.get(f"{path}?limit=100").json()) == 100
+    assert small == large
+
+
+@pytest.mark.parametrize("url, expected", [
+    # fiche + ressources (affaires liées jointes)
+    ("/whistleblowers/lanceur-5", 2),
+    # fiche + entités + ressources (lanceurs d'alerte joints)
+    ("/cases/affaire-5", 3),
+])
+def test_detail_query_count_is_fixed(client, statements, url, expected):
+    body = client.get(url).json()
+    related = body.get("related_cases") or body.get("whistleblowers")
+    assert len(body["resources"]) == 3 and len(related) >= 3
+
+    assert count_statements(client, statements, url) == expected
+
+
+@pytest.mark.parametrize("url", ["/whistleblowers/lanceur-5", "/cases/affaire-5"])
+def test_revalidation_skips_relationship_loading(client, statements, url):
+    etag = client.get(url).headers["etag"]
+
+    statements.reset()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # id et updated_at seulement
+    assert statements.count == 1
+
+    # ETag périmé : validation puis chargement complet
+    statements.reset()
+    assert client.get(url, headers={"If-None-Match": 'W/"perime"'}).status_code == 200
+    assert statements.count == 1 + (2 if url.startswith("/whistleblowers") else 3)
+
+
+@pytest.mark.parametrize("url", ["/search?q=affaire", "/search?q=affaire&facets=true"])
+def test_search_is_a_single_statement(client, statements, url):
+    body = client.get(url).json()
+    assert body["cases"]
+    if "facets=true" in url:
+        assert body["totals"]["cases"] == 110
+
+    # Résultats des trois types, et totaux et facettes tant qu'ils ne sont pas en cache
+    assert count_statements(client, statements, url.replace("affaire", "lanceur")) == 1
+    assert count_statements(client, statements, url.replace("affaire", "lanceur")) == 1
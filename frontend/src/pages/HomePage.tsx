@@ -65,15 +65,14 @@ export default function HomePage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [wbRes, casesRes, statsRes] = await Promise.all([
-          fetch(`${API_URL}/whistleblowers?featured_only=true&limit=6`),
-          fetch(`${API_URL}/cases?featured_only=true&limit=4`),
-          fetch(`${API_URL}/stats`)
-        ])
+        const res = await fetch(`${API_URL}/home`)
         
-        if (wbRes.ok) setWhistleblowers(await wbRes.json())
-        if (casesRes.ok) setCases(await casesRes.json())
-        if (statsRes.ok) setStats(await statsRes.json())
+        if (res.ok) {
+          const home = await res.json()
+          setWhistleblowers(home.featured_whistleblowers)
+          setCases(home.featured_cases)
+          setStats(home.stats)
+        }
       } catch (error) {
         console.error('Erreur lors du chargement:', error)
       } finally {
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
 import { Search, Users, FileText, Building2 } from 'lucide-react'
 
@@ -11,25 +11,72 @@ interface SearchResult {
   type: string
 }
 
+type ResultKind = 'whistleblowers' | 'cases' | 'entities'
+
 interface SearchResults {
   query: string
   whistleblowers: SearchResult[]
   cases: SearchResult[]
   entities: SearchResult[]
+  totals: Record<ResultKind, number>
+  facets: Record<ResultKind, Record<string, Record<string, number>>>
+}
+
+const facetLabels: Record<string, string> = {
+  domain: 'Domaines',
+  status: 'Statut',
+  revealer_type: 'Révélé par',
+  decade: 'Décennie',
+  country: 'Pays',
+}
+
+const suggestionPaths: Record<string, string> = {
+  whistleblower: '/lanceur',
+  case: '/affaire',
 }
 
 export default function SearchPage() {
   const [query, setQuery] = useState('')
   const [results, setResults] = useState<SearchResults | null>(null)
+  const [suggestions, setSuggestions] = useState<SearchResult[]>([])
   const [loading, setLoading] = useState(false)
 
+  useEffect(() => {
+    if (query.length < 2) {
+      setSuggestions([])
+      return
+    }
+
+    const controller = new AbortController()
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(`${API_URL}/search/suggest?q=${encodeURIComponent(query)}`, {
+          signal: controller.signal,
+        })
+        if (res.ok) {
+          setSuggestions((await res.json()).suggestions)
+        }
+      } catch (error) {
+        if ((error as Error).name !== 'AbortError') {
+          console.error('Erreur:', error)
+        }
+      }
+    }, 80)
+
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+  }, [query])
+
   const handleSearch = async (e: React.FormEvent) => {
     e.preventDefault()
     if (query.length < 2) return
 
     setLoading(true)
+    setSuggestions([])
     try {
-      const res = await fetch(`${API_URL}/search?q=${encodeURIComponent(query)}`)
+      const res = await fetch(`${API_URL}/search?q=${encodeURIComponent(query)}&facets=true`)
       if (res.ok) {
         setResults(await res.json())
       }
@@ -41,9 +88,26 @@ export default function SearchPage() {
   }
 
   const totalResults = results 
-    ? results.whistleblowers.length + results.cases.length + results.entities.length 
+    ? results.totals.whistleblowers + results.totals.cases + results.totals.entities 
     : 0
 
+  const renderFacets = (kind: ResultKind) => (
+    <div className="flex flex-wrap gap-x-6 gap-y-2 mb-4 text-sm">
+      {Object.entries(results?.facets[kind] ?? {})
+        .filter(([, counts]) => Object.keys(counts).length > 0)
+        .map(([facet, counts]) => (
+          <div key={facet} className="flex flex-wrap items-center gap-1">
+            <span className="text-slate-500">{facetLabels[facet] ?? facet} :</span>
+            {Object.entries(counts).slice(0, 6).map(([value, n]) => (
+              <span key={value} className="px-2 py-0.5 bg-slate-100 text-slate-700 rounded-full">
+                {facet === 'decade' ? `${value}s` : value} ({n})
+              </span>
+            ))}
+          </div>
+        ))}
+    </div>
+  )
+
   return (
     <div className="min-h-screen bg-slate-50">
       <div className="bg-white border-b">
@@ -67,6 +131,25 @@ export default function SearchPage() {
             >
               {loading ? '...' : 'Rechercher'}
             </button>
+
+            {suggestions.length > 0 && (
+              <ul className="absolute z-10 left-0 right-0 mt-2 bg-white border rounded-xl shadow-lg overflow-hidden">
+                {suggestions.map((s) => (
+                  <li key={`${s.type}-${s.id}`}>
+                    {suggestionPaths[s.type] ? (
+                      <Link
+                        to={`${suggestionPaths[s.type]}/${s.slug}`}
+                        className="block px-4 py-2 text-slate-900 hover:bg-amber-50 hover:text-amber-600"
+                      >
+                        {s.name}
+                      </Link>
+                    ) : (
+                      <span className="block px-4 py-2 text-slate-600">{s.name}</span>
+                    )}
+                  </li>
+                ))}
+              </ul>
+            )}
           </form>
         </div>
       </div>
@@ -83,7 +166,9 @@ export default function SearchPage() {
                 <h2 className="text-lg font-semibold text-slate-900 mb-4 flex items-center gap-2">
                   <Users className="h-5 w-5 text-amber-500" />
                   Lanceurs d'alerte
+                  <span className="text-sm font-normal text-slate-500">({results.totals.whistleblowers})</span>
                 </h2>
+                {renderFacets('whistleblowers')}
                 <div className="space-y-2">
                   {results.whistleblowers.map((r) => (
                     <Link
@@ -103,7 +188,9 @@ export default function SearchPage() {
                 <h2 className="text-lg font-semibold text-slate-900 mb-4 flex items-center gap-2">
                   <FileText className="h-5 w-5 text-amber-500" />
                   Affaires
+                  <span className="text-sm font-normal text-slate-500">({results.totals.cases})</span>
                 </h2>
+                {renderFacets('cases')}
                 <div className="space-y-2">
                   {results.cases.map((r) => (
                     <Link
@@ -123,7 +210,9 @@ export default function SearchPage() {
                 <h2 className="text-lg font-semibold text-slate-900 mb-4 flex items-center gap-2">
                   <Building2 className="h-5 w-5 text-slate-500" />
                   Entités
+                  <span className="text-sm font-normal text-slate-500">({results.totals.entities})</span>
                 </h2>
+                {renderFacets('entities')}
                 <div className="space-y-2">
                   {results.entities.map((r) => (
                     <div